@@ -1,127 +1,126 @@
 import numpy as np
 import cv2 as cv
 
+from Decoder import decode, format_resistance
 
-# sorts bands by x coordinates
 
-class SortBands:
-
-    # initialises object with attributes contours and empty list
-    def __init__(self, contours):
-        self.__contours = contours
-        self.__sorted_contours = []
-
-    # find x centre value of contour centroid
-
-    def __calculate_cx(self, moment):
-
-        if moment['m00'] != 0:
-            cx = int(moment['m10'] / moment['m00'])
-        else:
-            cx = 0
+# sorts bands by x coordinates, or by their position along any other axis
 
-        return cx
-
-    # sort two lists based on x
-    def __sort_two_lists(self, left_half, right_half):
+class SortBands:
 
-        # initialise index as 0
+    # initialises object with attributes contours and the axis to order along
+    # axis is None for image x, or an (x, y) direction such as the resistor's long side
 
-        left_index = 0
-        right_index = 0
+    def __init__(self, contours, axis=None):
+        self.__contours = contours
+        self.__axis = axis
 
-        # compare x values in left and right halves and sort
-        while left_index < len(left_half.contours) and right_index < len(right_half.contours):
+    # position of every contour centroid along the axis, computing each contour's moments once
 
-            left_moment = cv.moments(left_half.contours[left_index])
-            right_moment = cv.moments(right_half.contours[right_index])
-            left_cx = left_half.__calculate_cx(left_moment)
-            right_cx = right_half.__calculate_cx(right_moment)
+    def band_keys(self):
+        moments = [cv.moments(contour) for contour in self.__contours]
+        areas = np.array([moment['m00'] for moment in moments], dtype=np.float64)
+        sums_x = np.array([moment['m10'] for moment in moments], dtype=np.float64)
+        nonzero = areas != 0
+        centre_x = np.divide(sums_x, areas, out=np.zeros_like(areas), where=nonzero)
 
-            if left_cx < right_cx:
-                self.__sorted_contours.append(left_half.contours[left_index])
-                left_index += 1
-            else:
-                self.__sorted_contours.append(right_half.contours[right_index])
-                right_index += 1
+        if self.__axis is None:
+            # whole pixels, as the centroids have always been compared
+            return np.trunc(centre_x).astype(np.int64)
 
-        # sort remaining contours
-        while left_index < len(left_half.contours):
-            self.__sorted_contours.append(left_half.contours[left_index])
-            left_index += 1
+        sums_y = np.array([moment['m01'] for moment in moments], dtype=np.float64)
+        centre_y = np.divide(sums_y, areas, out=np.zeros_like(areas), where=nonzero)
+        axis_x, axis_y = self.__axis
+        return centre_x * axis_x + centre_y * axis_y
 
-        while right_index < len(right_half.contours):
-            self.__sorted_contours.append(right_half.contours[right_index])
-            right_index += 1
+    # contours in increasing order of their keys
+    # contours with equal keys come out in reverse order, as the merge sort used to leave them
 
-        return self.__sorted_contours
-
-    # perform merge sort
-    def merge_sort_contours(self):
-        # base case
+    def sort_contours(self):
         if len(self.__contours) <= 1:
-            return self.__contours
-
-        # divide contours list in half
-        middle = len(self.__contours) // 2
+            return list(self.__contours)
 
-        # create instances of SortBands with half the values
-        left_half = SortBands(self.__contours[:middle])
-        right_half = SortBands(self.__contours[middle:])
+        keys = self.band_keys()
+        order = np.lexsort((-np.arange(len(keys)), keys))
+        return [self.__contours[index] for index in order]
 
-        # recursively call merge sort until every list is just one element
-        left_half.contours = left_half.merge_sort_contours()
-        right_half.contours = right_half.merge_sort_contours()
-
-        # sort final two halves
-        return self.__sort_two_lists(left_half, right_half)
+    # kept for existing callers, the sort no longer recurses
+    def merge_sort_contours(self):
+        return self.sort_contours()
 
 
 # identify bands uniquely
 class UniqueBands:
 
-    # contours, empty array for unique contours as attribute to instantiated object
-    def __init__(self, contours):
-        self.__selected_contours = []
+    # contours and which contour of an overlapping group to keep: 'first' keeps each contour whose
+    # x range does not run into one kept before it (in the order given), 'largest' keeps the contour
+    # of largest area from every group of contours whose x ranges overlap or touch
+    def __init__(self, contours, keep='first'):
+        if keep not in ('first', 'largest'):
+            raise ValueError(f"Unknown band selection: {keep}")
         self.__contours = contours
+        self.__keep = keep
 
     # ensures the same band is not recognised twice or more
 
     def find_unique_bands(self):
+        if len(self.__contours) == 0:
+            return []
 
-        # analyse area occupied by every contour
-        for contour in self.__contours:
-            contour_x, _, contour_width, _ = cv.boundingRect(contour)
-
-            # specify x area occupied by current contour
-            x_min = contour_x + 0.5
-            x_max = contour_x + contour_width - 0.5
-
-            if not self.__selected_contours:
-
-                # If the list is empty, add the first contour
-                self.__selected_contours.append(contour)
+        # x range of every contour, computed once
+        rectangles = np.array([cv.boundingRect(contour) for contour in self.__contours], dtype=np.int64)
+        lefts = rectangles[:, 0]
+        rights = rectangles[:, 0] + rectangles[:, 2]
 
+        if self.__keep == 'largest':
+            kept = self.__largest_per_group(lefts, rights)
+        else:
+            kept = self.__first_seen(lefts, rights)
+        return [self.__contours[index] for index in kept]
+
+    # a contour spans x + 0.5 to x + width - 0.5, and a kept contour claims x - 0.5 to x + width + 0.5;
+    # a contour is rejected when either end of its span lies on a claimed position
+    # positions are doubled so every half pixel is a whole index into the claimed array
+
+    @staticmethod
+    def __first_seen(lefts, rights):
+        span_starts = 2 * lefts + 1
+        span_ends = 2 * rights - 1
+        claim_starts = 2 * lefts - 1
+        claim_ends = 2 * rights + 1
+
+        # shift so the lowest claimed position is index 0
+        origin = min(claim_starts.min(), span_ends.min())
+        claimed = np.zeros(int(max(claim_ends.max(), span_starts.max()) - origin + 1), dtype=bool)
+
+        kept = []
+        for index in range(len(lefts)):
+            if not (claimed[span_starts[index] - origin] or claimed[span_ends[index] - origin]):
+                kept.append(index)
+                claimed[claim_starts[index] - origin: claim_ends[index] - origin + 1] = True
+        return kept
+
+    # sweeps the ranges in order of their left edge, starting a new group whenever one begins after
+    # every range before it has ended, and keeps the largest contour of each group (the earliest on ties)
+
+    def __largest_per_group(self, lefts, rights):
+        areas = np.array([cv.contourArea(contour) for contour in self.__contours])
+        order = np.argsort(lefts, kind='stable')
+
+        best = order[0]
+        group_end = rights[best]
+        kept = []
+        for index in order[1:]:
+            if lefts[index] > group_end:
+                kept.append(best)
+                best = index
+                group_end = rights[index]
             else:
-                overlapping = False
-
-                # nested for loop to check if any band (contour) has an x range overlapping with current contour
-                for selected_contour in self.__selected_contours:
-                    # repeat process for x ranges
-                    selected_x, _, selected_w, _ = cv.boundingRect(selected_contour)
-                    selected_x_min = selected_x - 0.5
-                    selected_x_max = selected_x + selected_w + 0.5
-
-                    # check if these overlap
-                    if ((selected_x_min <= x_min <= selected_x_max) or (
-                            selected_x_min <= x_max <= selected_x_max)):
-                        overlapping = True
-                        break
-                if not overlapping:
-                    # add band as unique
-                    self.__selected_contours.append(contour)
-
-        return self.__selected_contours
+                group_end = max(group_end, rights[index])
+                if areas[index] > areas[best] or (areas[index] == areas[best] and index < best):
+                    best = index
+        kept.append(best)
+        return sorted(kept)
 
 
 class SortColours:
@@ -130,62 +129,104 @@ class SortColours:
     def __init__(self, sorted_contours, orange_contours, red_contours, green_contours, blue_contours,
                  yellow_contours, black_contours, brown_contours, gold_contours, white_contours, violet_contours):
         self.__sorted_contours = sorted_contours
-        self.__orange_contours = orange_contours
-        self.__red_contours = red_contours
-        self.__green_contours = green_contours
-        self.__blue_contours = blue_contours
-        self.__yellow_contours = yellow_contours
-        self.__black_contours = black_contours
-        self.__brown_contours = brown_contours
-        self.__gold_contours = gold_contours
-        self.__violet_contours = violet_contours
-        self.__white_contours = white_contours
-
-    # finds what colour the band associates with
-    def __match_contours(self, current_contour, colour_contours):
-        for contour_reference in colour_contours:
-            # check if there is a similarity in shape of contours from colour contours
-            ret = cv.matchShapes(contour_reference, current_contour, 1, 0)
-            current_moment = cv.moments(current_contour)
-            cx_current = int(current_moment['m10'] / current_moment['m00']) if current_moment['m00'] != 0 else 0
-            reference_moment = cv.moments(contour_reference)
-            cx_reference = int(reference_moment['m10'] / reference_moment['m00']) if reference_moment['m00'] != 0 else 0
-            # Set a threshold for shape similarity and centroid x-value range
-            thresh_shape = 0.1
-            thresh_centre_x = 10
-            # Check if there is similarity in both shape and centroid x-value
-            if ret <= thresh_shape and abs(cx_current - cx_reference) <= thresh_centre_x:
-                return True
-
-        return False
+        self.__colour_contours = {'orange': orange_contours, 'red': red_contours, 'green': green_contours,
+                                  'blue': blue_contours, 'yellow': yellow_contours, 'black': black_contours,
+                                  'brown': brown_contours, 'gold': gold_contours, 'violet': violet_contours,
+                                  'white': white_contours}
+
+    # colours in order of preference; a band gets the colour of its closest matching reference contour,
+    # and this order decides between references that match equally well
+    colour_priority = ('orange', 'red', 'green', 'blue', 'yellow', 'black', 'brown', 'gold', 'violet', 'white')
+
+    # a band matches a reference contour when their shapes differ by at most thresh_shape
+    # (cv.matchShapes with CONTOURS_MATCH_I1) and their centroids by at most thresh_centre_x pixels
+    thresh_shape = 0.1
+    thresh_centre_x = 10
+
+    # centroid x (whole pixels) and signed log Hu moment terms of every contour, as matchShapes uses them
+    # terms of Hu moments too close to zero are marked invalid and left out of the comparison
+
+    @staticmethod
+    def __shape_features(contours):
+        count = len(contours)
+        centre_x = np.zeros(count, dtype=np.int64)
+        hu_moments = np.zeros((count, 7), dtype=np.float64)
+        for index, contour in enumerate(contours):
+            moment = cv.moments(contour)
+            centre_x[index] = int(moment['m10'] / moment['m00']) if moment['m00'] != 0 else 0
+            hu_moments[index] = cv.HuMoments(moment).ravel()
+
+        magnitudes = np.abs(hu_moments)
+        valid = magnitudes > 1e-5
+        with np.errstate(divide='ignore', invalid='ignore'):
+            terms = 1.0 / (np.sign(hu_moments) * np.log10(np.where(valid, magnitudes, 1.0)))
+        return centre_x, np.where(valid, terms, 0.0), valid, (magnitudes > 0).any(axis=1)
+
+    # reference contours of every colour in one index, ordered by colour preference
+
+    def __reference_index(self):
+        references = []
+        colours = []
+        for colour_index, colour in enumerate(self.colour_priority):
+            colour_contours = self.__colour_contours[colour]
+            references.extend(colour_contours)
+            colours.extend([colour_index] * len(colour_contours))
+        return self.__shape_features(references), np.array(colours, dtype=np.int64)
+
+    # colour and confidence of every band that matches a reference, in band order
+    # the confidence is 1 for identical shapes and falls to 0 at the shape threshold
+
+    def scored_assignment(self):
+        if len(self.__sorted_contours) == 0:
+            return []
+
+        (reference_x, reference_terms, reference_valid, reference_any), colours = self.__reference_index()
+        if len(colours) == 0:
+            return []
+        band_x, band_terms, band_valid, band_any = self.__shape_features(self.__sorted_contours)
+
+        # matchShapes I1 distance between every band (rows) and every reference (columns)
+        both_valid = band_valid[:, None, :] & reference_valid[None, :, :]
+        with np.errstate(invalid='ignore'):
+            differences = np.abs(reference_terms[None, :, :] - band_terms[:, None, :])
+        distances = np.where(both_valid, differences, 0.0).sum(axis=2)
+        distances[band_any[:, None] != reference_any[None, :]] = np.finfo(np.float64).max
+
+        matches = (distances <= self.thresh_shape) & \
+                  (np.abs(band_x[:, None] - reference_x[None, :]) <= self.thresh_centre_x)
+
+        assignment = []
+        for band in range(len(band_x)):
+            matched = np.flatnonzero(matches[band])
+            if len(matched) == 0:
+                continue
+
+            # nearest reference names the colour; argmin takes the first of equals, the preferred colour
+            best = matched[np.argmin(distances[band, matched])]
+            colour = colours[best]
+            best_distance = distances[band, best]
+            assignment.append((self.colour_priority[colour], float(1.0 - best_distance / self.thresh_shape)))
+        return assignment
+
+    # colour of every band that matches a reference, in band order
 
     def colour_assignment(self):
-        sorted_contours_colours = []
-        count = 0
-        # loop to ensure correct number of bands identified in reasonable time
-        while len(sorted_contours_colours) != 4 and count < 20 and 'gold' not in sorted_contours_colours:
-            for contour in self.__sorted_contours:
-                count += 1
-
-                # calls match_contours to add associated colour to a new list
-                if self.__match_contours(contour, self.__orange_contours):
-                    sorted_contours_colours.append('orange')
-                elif self.__match_contours(contour, self.__red_contours):
-                    sorted_contours_colours.append('red')
-                elif self.__match_contours(contour, self.__green_contours):
-                    sorted_contours_colours.append('green')
-                elif self.__match_contours(contour, self.__blue_contours):
-                    sorted_contours_colours.append('blue')
-                elif self.__match_contours(contour, self.__yellow_contours):
-                    sorted_contours_colours.append('yellow')
-                elif self.__match_contours(contour, self.__black_contours):
-                    sorted_contours_colours.append('black')
-                elif self.__match_contours(contour, self.__brown_contours):
-                    sorted_contours_colours.append('brown')
-                elif self.__match_contours(contour, self.__gold_contours):
-                    sorted_contours_colours.append('gold')
-                elif self.__match_contours(contour, self.__violet_contours):
-                    sorted_contours_colours.append('violet')
-                elif self.__match_contours(contour, self.__white_contours):
-                    sorted_contours_colours.append('white')
-        return sorted_contours_colours
+        return [colour for colour, _ in self.scored_assignment()]
+
+
+# calculates the resistance of the resistor from 4, 5 or 6 band colours
+class ResistanceCalculation:
+    # initialise with the bands in reading order
+    def __init__(self, *bands):
+        self.__bands = bands
+
+    # decoded value as a record with ohms, tolerance, tempco and valid fields
+
+    def decode(self):
+        return decode(self.__bands)
+
+    def findResistance(self):
+        result = self.decode()
+        if not result['valid']:
+            raise ValueError("Unrecognised band colours: " + ", ".join(str(band) for band in self.__bands))
+        return format_resistance(result)
@@ -0,0 +1,57 @@
+# import necessary libraries
+import hashlib
+import os
+import tkinter as tk
+
+from config import ASSET_CACHE_DIR
+
+
+# homepage images, stored on disk at the size they are shown at so a launch decodes only those pixels
+# a derivative is rebuilt when its source changes; PIL and numpy are imported only to build one
+
+
+# path of the derivative of an image, named after the source file's size, modification time and the scaling
+
+def derivative_path(path, subsample=1, size=None, cache_dir=ASSET_CACHE_DIR):
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}|{subsample}|{size}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{name}-{digest}.png")
+
+
+# writes the derivative: every subsample-th pixel, as PhotoImage.subsample keeps, then the top left
+# (width, height) of that, which is all a label placed at the window origin shows
+
+def build_derivative(path, destination, subsample=1, size=None):
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as image:
+        if image.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        pixels = np.asarray(image)
+
+    pixels = pixels[::subsample, ::subsample]
+    if size is not None:
+        pixels = pixels[:size[1], :size[0]]
+
+    # written under a temporary name first, so a launch never reads a half written file
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    temporary = f"{destination}.{os.getpid()}.tmp"
+    Image.fromarray(np.ascontiguousarray(pixels)).save(temporary, format='PNG', optimize=True)
+    os.replace(temporary, destination)
+
+
+# PhotoImage of an image at its displayed size, building the derivative on first use
+# without a writable cache directory the original is decoded and subsampled in Tk as before
+
+def photo_image(path, subsample=1, size=None, cache_dir=ASSET_CACHE_DIR):
+    try:
+        derivative = derivative_path(path, subsample, size, cache_dir)
+        if not os.path.exists(derivative):
+            build_derivative(path, derivative, subsample, size)
+        return tk.PhotoImage(file=derivative)
+    except OSError:
+        photo = tk.PhotoImage(file=path)
+        return photo.subsample(subsample, subsample) if subsample > 1 else photo
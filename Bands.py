@@ -4,45 +4,167 @@ import numpy as np
 import cv2 as cv
 import random
 
+from config import HSV_RANGES
+
+
+# labels every pixel with at most one colour from a single HSV conversion
+
+class ColourClassifier:
+
+    # colours in the order the detectors run; earlier colours win pixels inside several ranges
+    colour_priority = ('gold', 'brown', 'green', 'violet', 'yellow', 'red', 'black', 'orange', 'blue', 'white',
+                       'grey')
+
+    # lookup tables shared by every classifier, built once from the configured HSV ranges
+    __channel_tables = None
+    __first_match_table = None
+
+    # a BufferPool gives the HSV image, labels and masks arrays reused from frame to frame
+
+    def __init__(self, image, pool=None):
+        self._image = image
+        self._pool = pool
+        self.__labels = None
+
+    # build one table per channel giving the set of colours (as bits) whose range holds each value,
+    # and a table turning a set of colours into the label of its highest priority colour
+
+    @classmethod
+    def __build_tables(cls):
+        channel_tables = np.zeros((3, 256), dtype=np.uint16)
+        for bit, colour in enumerate(cls.colour_priority):
+            lower = HSV_RANGES[colour]['lower']
+            upper = HSV_RANGES[colour]['upper']
+            for channel in range(3):
+                channel_tables[channel, lower[channel]:upper[channel] + 1] |= 1 << bit
+
+        # label 0 means no colour, otherwise the position of the lowest set bit plus one
+        colour_sets = np.arange(1 << len(cls.colour_priority))
+        lowest_bits = colour_sets & -colour_sets
+        first_match_table = np.zeros(len(colour_sets), dtype=np.uint8)
+        first_match_table[1:] = np.log2(lowest_bits[1:]).astype(np.uint8) + 1
+
+        cls.__channel_tables = channel_tables
+        cls.__first_match_table = first_match_table
+
+    # label image, computed on first use
+
+    def labels(self):
+        if self.__labels is None:
+            if ColourClassifier.__channel_tables is None:
+                ColourClassifier.__build_tables()
+
+            # convert to HSV once and look every pixel up in the tables
+            tables = ColourClassifier.__channel_tables
+            if self._pool is None:
+                img_hsv = cv.cvtColor(self._image, cv.COLOR_BGR2HSV)
+                colour_sets = tables[0][img_hsv[:, :, 0]] & tables[1][img_hsv[:, :, 1]] & tables[2][img_hsv[:, :, 2]]
+                self.__labels = ColourClassifier.__first_match_table[colour_sets]
+            else:
+                pool = self._pool
+                shape = self._image.shape[:2]
+                img_hsv = cv.cvtColor(self._image, cv.COLOR_BGR2HSV, dst=pool.get('hsv', self._image.shape))
+                colour_sets = np.take(tables[0], img_hsv[:, :, 0], out=pool.get('colour_sets', shape, np.uint16),
+                                      mode='clip')
+                channel_sets = pool.get('channel_sets', shape, np.uint16)
+                for channel in (1, 2):
+                    np.bitwise_and(colour_sets, np.take(tables[channel], img_hsv[:, :, channel], out=channel_sets, mode='clip'),
+                                   out=colour_sets)
+                self.__labels = np.take(ColourClassifier.__first_match_table, colour_sets,
+                                        out=pool.get('labels', shape), mode='clip')
+
+        return self.__labels
+
+    # binary mask (0 or 255) of the pixels labelled with the given colour
+
+    def colour_mask(self, colour):
+        labels = self.labels()
+        dst = None if self._pool is None else self._pool.get('colour_mask', labels.shape)
+        return cv.compare(labels, self.colour_priority.index(colour) + 1, cv.CMP_EQ, dst=dst)
+
 
 # define parent class to identify colours
 
 class ColourBands:
 
+    # whether the band image is median blurred before its contours are found
+    _median_blur = False
+
     # initialise with image and combined_image
+    # with a BufferPool the intermediate images come from it and the combined image is updated in place
 
-    def __init__(self, image, combined_image):
+    def __init__(self, image, combined_image, classifier=None, pool=None):
         self._image = image
         self._combined_image = combined_image
+        self._classifier = classifier
+        self._pool = pool
+        self._colour = None
         self._min_area_threshold = None
 
+    # array from the pool for dst=, or None so OpenCV allocates the result
+
+    def _buffer(self, name, shape, dtype=np.uint8):
+        return None if self._pool is None else self._pool.get(name, shape, dtype)
+
+    # find pixels in the colour's HSV range, reusing the shared classifier if there is one
+
+    def _initial_mask(self):
+        if self._classifier is not None:
+            return self._classifier.colour_mask(self._colour)
+
+        # convert to HSV
+        img_hsv = cv.cvtColor(self._image, cv.COLOR_BGR2HSV, dst=self._buffer('hsv', self._image.shape))
+        return cv.inRange(img_hsv, self._lower_hsv, self._upper_hsv,
+                          dst=self._buffer('colour_mask', self._image.shape[:2]))
+
+    # connected components of the initial mask, with their statistics
+
+    def _components(self):
+        initial_mask = self._initial_mask()
+        return cv.connectedComponentsWithStats(
+            initial_mask, labels=self._buffer('component_labels', initial_mask.shape, np.int32), connectivity=8)
+
     # find mask that detects colour
 
     def _colour_mask(self):
-        # convert to HSV
-        img_hsv = cv.cvtColor(self._image, cv.COLOR_BGR2HSV)
         # find pixels in HSV range
-        initial_mask = cv.inRange(img_hsv, self._lower_hsv, self._upper_hsv)
-        num_labels, labels, stats, centroids = cv.connectedComponentsWithStats(initial_mask, connectivity=8)
-        refined_mask = np.zeros_like(initial_mask)
-        # filter based on area of mask components
-        for label in range(1, num_labels):
-            if self._min_area_threshold < stats[label, cv.CC_STAT_AREA] < 1300:
-                refined_mask[labels == label] = 255
+        num_labels, labels, stats, centroids = self._components()
+        # filter based on area of mask components, never keeping the background label
+        areas = stats[:, cv.CC_STAT_AREA]
+        keep = (self._min_area_threshold < areas) & (areas < 1300)
+        keep[0] = False
+
+        return self._bgr_mask(self._refined_mask(labels, keep))
 
-        return cv.cvtColor(refined_mask, cv.COLOR_GRAY2BGR)
+    # paint every kept component in one lookup over the label image
+
+    def _refined_mask(self, labels, keep):
+        keep_table = np.where(keep, 255, 0).astype(np.uint8)
+        return np.take(keep_table, labels, out=self._buffer('refined_mask', labels.shape), mode='clip')
+
+    def _bgr_mask(self, mask):
+        return cv.cvtColor(mask, cv.COLOR_GRAY2BGR, dst=self._buffer('bgr_mask', mask.shape + (3,)))
 
     def colour_band_image(self):
+        height, width = self._image.shape[:2]
+
         # new image showing only the identified colour band
-        mask = cv.resize(self._colour_mask(), (self._image.shape[1], self._image.shape[0]))
-        band_img = cv.bitwise_and(mask, self._image)
-        # band_img = cv.medianBlur(band_img, 5)
-        band_img_gray = cv.cvtColor(band_img, cv.COLOR_BGR2GRAY)
-        _, threshold = cv.threshold(band_img_gray, 1, 255, cv.THRESH_BINARY)
+        mask = self._colour_mask()
+        if mask.shape[:2] != (height, width):
+            mask = cv.resize(mask, (width, height))
+        band_img = cv.bitwise_and(mask, self._image, dst=self._buffer('band_image', self._image.shape))
+        if self._median_blur:
+            band_img = cv.medianBlur(band_img, 5, dst=self._buffer('blurred_band_image', self._image.shape))
+        band_img_gray = cv.cvtColor(band_img, cv.COLOR_BGR2GRAY, dst=self._buffer('band_gray', (height, width)))
+        _, threshold = cv.threshold(band_img_gray, 1, 255, cv.THRESH_BINARY,
+                                    dst=self._buffer('band_threshold', (height, width)))
         contours, _ = cv.findContours(threshold, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
-        self._combined_image = cv.resize(self._combined_image, (self._image.shape[1], self._image.shape[0]))
-        # add bands to combined image
-        self._combined_image = cv.bitwise_or(self._combined_image, band_img)
+
+        # add bands to combined image, in place when the intermediate images are pooled
+        if self._combined_image.shape[:2] != (height, width):
+            self._combined_image = cv.resize(self._combined_image, (width, height))
+        self._combined_image = cv.bitwise_or(self._combined_image, band_img,
+                                             dst=None if self._pool is None else self._combined_image)
         return contours, self._combined_image
 
 
@@ -50,172 +172,119 @@ class ColourBands:
 
 class GoldBand(ColourBands):
 
-    def __init__(self, image, combined_image):
+    _median_blur = True
+
+    def __init__(self, image, combined_image, classifier=None, pool=None):
         # call from superclass
-        super().__init__(image, combined_image)
+        super().__init__(image, combined_image, classifier, pool)
+        self._colour = 'gold'
         self._lower_hsv = np.array([11, 32, 54])
         self._upper_hsv = np.array([22, 53, 141])
 
     # override method from superclass
 
     def _colour_mask(self):
-        img_hsv = cv.cvtColor(self._image, cv.COLOR_BGR2HSV)
-        initial_mask = cv.inRange(img_hsv, self._lower_hsv, self._upper_hsv)
-        num_labels, labels, stats, centroids = cv.connectedComponentsWithStats(initial_mask, connectivity=8)
-        # only detect largest label for gold
-        largest_gold_label = np.argmax(stats[1:, cv.CC_STAT_AREA]) + 1
-        refined_mask = np.zeros_like(initial_mask)
-
-        refined_mask[labels == largest_gold_label] = 255
-        return cv.cvtColor(refined_mask, cv.COLOR_GRAY2BGR)
+        num_labels, labels, stats, centroids = self._components()
+        # only detect largest label for gold, leaving the mask empty if there is none
+        keep = np.zeros(num_labels, dtype=bool)
+        if num_labels > 1:
+            largest_gold_label = np.argmax(stats[1:, cv.CC_STAT_AREA]) + 1
+            keep[largest_gold_label] = True
 
-    def colour_band_image(self):
-        # new image showing only the identified colour band
-        mask = cv.resize(self._colour_mask(), (self._image.shape[1], self._image.shape[0]))
-        band_img = cv.bitwise_and(mask, self._image)
-        band_img = cv.medianBlur(band_img, 5)
-        band_img_gray = cv.cvtColor(band_img, cv.COLOR_BGR2GRAY)
-        _, threshold = cv.threshold(band_img_gray, 1, 255, cv.THRESH_BINARY)
-        contours, _ = cv.findContours(threshold, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
-        self._combined_image = cv.resize(self._combined_image, (self._image.shape[1], self._image.shape[0]))
-        # add bands to combined image
-        self._combined_image = cv.bitwise_or(self._combined_image, band_img)
-        return contours, self._combined_image
+        return self._bgr_mask(self._refined_mask(labels, keep))
 
 
 # similar for other subclasses for other colours
 
 class BrownBands(ColourBands):
-    def __init__(self, image, combined_image):
-        super().__init__(image, combined_image)
+
+    # blurred like the gold band
+    _median_blur = True
+
+    def __init__(self, image, combined_image, classifier=None, pool=None):
+        super().__init__(image, combined_image, classifier, pool)
+        self._colour = 'brown'
         self._lower_hsv = np.array([0, 50, 50])
         self._upper_hsv = np.array([180, 76, 120])
         self._min_area_threshold = 200
 
-    # overriding default to include blurring
-    def colour_band_image(self):
-        # new image showing only the identified colour band
-        mask = cv.resize(self._colour_mask(), (self._image.shape[1], self._image.shape[0]))
-        band_img = cv.bitwise_and(mask, self._image)
-        band_img = cv.medianBlur(band_img, 5)
-        band_img_gray = cv.cvtColor(band_img, cv.COLOR_BGR2GRAY)
-        _, threshold = cv.threshold(band_img_gray, 1, 255, cv.THRESH_BINARY)
-        contours, _ = cv.findContours(threshold, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
-        self._combined_image = cv.resize(self._combined_image, (self._image.shape[1], self._image.shape[0]))
-        # add bands to combined image
-        self._combined_image = cv.bitwise_or(self._combined_image, band_img)
-        return contours, self._combined_image
-
 
 class BlackBands(ColourBands):
-    def __init__(self, image, combined_image):
-        super().__init__(image, combined_image)
+    def __init__(self, image, combined_image, classifier=None, pool=None):
+        super().__init__(image, combined_image, classifier, pool)
+        self._colour = 'black'
         self._lower_hsv = np.array([25, 0, 20])
         self._upper_hsv = np.array([150, 90, 86])
         self._min_area_threshold = 2000
 
-    def _colour_mask(self):
-        # convert to HSV
-        img_hsv = cv.cvtColor(self._image, cv.COLOR_BGR2HSV)
-        # find pixels in HSV range
-        initial_mask = cv.inRange(img_hsv, self._lower_hsv, self._upper_hsv)
-        num_labels, labels, stats, centroids = cv.connectedComponentsWithStats(initial_mask, connectivity=8)
-        refined_mask = np.zeros_like(initial_mask)
-        # filter based on area of mask components
-        for label in range(1, num_labels):
-            if self._min_area_threshold < stats[label, cv.CC_STAT_AREA] < 1300:
-                refined_mask[labels == label] = 255
-
-        return cv.cvtColor(refined_mask, cv.COLOR_GRAY2BGR)
-
 
 class GreenBands(ColourBands):
-    def __init__(self, image, combined_image):
-        super().__init__(image, combined_image)
+    def __init__(self, image, combined_image, classifier=None, pool=None):
+        super().__init__(image, combined_image, classifier, pool)
+        self._colour = 'green'
         self._lower_hsv = np.array([40, 130, 62])
         self._upper_hsv = np.array([74, 180, 115])
         self._min_area_threshold = 60
 
 
 class YellowBands(ColourBands):
-    def __init__(self, image, combined_image):
-        super().__init__(image, combined_image)
+    def __init__(self, image, combined_image, classifier=None, pool=None):
+        super().__init__(image, combined_image, classifier, pool)
+        self._colour = 'yellow'
         self._lower_hsv = np.array([23, 98, 138])
         self._upper_hsv = np.array([53, 190, 240])
         self._min_area_threshold = 20
 
-    def _colour_mask(self):
-        # convert to HSV
-        img_hsv = cv.cvtColor(self._image, cv.COLOR_BGR2HSV)
-        # find pixels in HSV range
-        initial_mask = cv.inRange(img_hsv, self._lower_hsv, self._upper_hsv)
-        num_labels, labels, stats, centroids = cv.connectedComponentsWithStats(initial_mask, connectivity=8)
-        refined_mask = np.zeros_like(initial_mask)
-        # filter based on area of mask components
-        for label in range(1, num_labels):
-            if self._min_area_threshold < stats[label, cv.CC_STAT_AREA] < 1300:
-                refined_mask[labels == label] = 255
-
-        return cv.cvtColor(refined_mask, cv.COLOR_GRAY2BGR)
-
 
 class RedBands(ColourBands):
-    def __init__(self, image, combined_image):
-        super().__init__(image, combined_image)
+    def __init__(self, image, combined_image, classifier=None, pool=None):
+        super().__init__(image, combined_image, classifier, pool)
+        self._colour = 'red'
         self._lower_hsv = np.array([150, 110, 90])
         self._upper_hsv = np.array([180, 180, 210])
         self._min_area_threshold = 50
 
 
 class VioletBands(ColourBands):
-    def __init__(self, image, combined_image):
-        super().__init__(image, combined_image)
+    def __init__(self, image, combined_image, classifier=None, pool=None):
+        super().__init__(image, combined_image, classifier, pool)
+        self._colour = 'violet'
         self._lower_hsv = np.array([125, 50, 100])
         self._upper_hsv = np.array([167, 125, 160])
         self._min_area_threshold = 100
 
-    def _colour_mask(self):
-        # convert to HSV
-        img_hsv = cv.cvtColor(self._image, cv.COLOR_BGR2HSV)
-        # find pixels in HSV range
-        initial_mask = cv.inRange(img_hsv, self._lower_hsv, self._upper_hsv)
-        num_labels, labels, stats, centroids = cv.connectedComponentsWithStats(initial_mask, connectivity=8)
-        refined_mask = np.zeros_like(initial_mask)
-        # filter based on area of mask components
-        for label in range(1, num_labels):
-            if self._min_area_threshold < stats[label, cv.CC_STAT_AREA] < 1300:
-                refined_mask[labels == label] = 255
-
-        return cv.cvtColor(refined_mask, cv.COLOR_GRAY2BGR)
-
 
 class BlueBands(ColourBands):
-    def __init__(self, image, combined_image):
-        super().__init__(image, combined_image)
+    def __init__(self, image, combined_image, classifier=None, pool=None):
+        super().__init__(image, combined_image, classifier, pool)
+        self._colour = 'blue'
         self._lower_hsv = np.array([90, 94, 79])
         self._upper_hsv = np.array([120, 148, 138])
         self._min_area_threshold = 50
 
 
 class OrangeBands(ColourBands):
-    def __init__(self, image, combined_image):
-        super().__init__(image, combined_image)
+    def __init__(self, image, combined_image, classifier=None, pool=None):
+        super().__init__(image, combined_image, classifier, pool)
+        self._colour = 'orange'
         self._lower_hsv = np.array([0, 110, 145])
         self._upper_hsv = np.array([30, 174, 205])
         self._min_area_threshold = 100
 
 
 class WhiteBands(ColourBands):
-    def __init__(self, image, combined_image):
-        super().__init__(image, combined_image)
+    def __init__(self, image, combined_image, classifier=None, pool=None):
+        super().__init__(image, combined_image, classifier, pool)
+        self._colour = 'white'
         self._lower_hsv = np.array([20, 12, 134])
         self._upper_hsv = np.array([30, 40, 170])
         self._min_area_threshold = 2000
 
 
 class GreyBands(ColourBands):
-    def __init__(self, image, combined_image):
-        super().__init__(image, combined_image)
+    def __init__(self, image, combined_image, classifier=None, pool=None):
+        super().__init__(image, combined_image, classifier, pool)
+        self._colour = 'grey'
         self._lower_hsv = np.array([44, 0, 46])
         self._upper_hsv = np.array([180, 20, 90])
         self._min_area_threshold = 50
@@ -0,0 +1,171 @@
+# import necessary libraries
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import sys
+
+import cv2 as cv
+
+# import classes self-created
+from Pipeline import RecognitionPipeline
+from Tracing import span, add_sink, tracing, JsonLogSink, ProfileSink
+
+
+# image files picked up when a directory is given
+IMAGE_EXTENSIONS = ('.bmp', '.jpeg', '.jpg', '.png', '.tif', '.tiff')
+
+# pipeline used by this process, created once per pool worker
+_pipeline = None
+
+
+# expands directories and glob patterns into a sorted list of image paths, keeping argument order
+
+def find_images(inputs):
+    paths = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                       if name.lower().endswith(IMAGE_EXTENSIONS)]
+        else:
+            matches = glob.glob(pattern, recursive=True) or [pattern]
+        paths.extend(sorted(matches))
+    return paths
+
+
+# pool workers append their own spans to the shared trace file
+
+def _init_worker(trace_path=None):
+    global _pipeline
+    _pipeline = RecognitionPipeline()
+    if trace_path is not None:
+        add_sink(JsonLogSink(trace_path))
+
+
+# runs the whole recognition chain on one stored image and returns its record
+
+def recognise_image(path):
+    frame = cv.imread(path)
+    if frame is None:
+        record = empty_record()
+        record['error'] = "ValueError: could not read image"
+    else:
+        with span('batch.image', path=path, shape=frame.shape):
+            record = recognise_frame(frame)
+    return dict(path=path, **record)
+
+
+# record of a frame that was not recognised
+
+def empty_record():
+    return {'colours': None, 'confidences': None, 'resistance': None, 'error': None, 'timings': {}}
+
+
+# runs the whole recognition chain on a decoded frame with this process's pipeline
+
+def recognise_frame(frame):
+    if _pipeline is None:
+        _init_worker()
+
+    record = empty_record()
+    _pipeline.load_frame(frame)
+    try:
+        if not _pipeline.resistor_detected():
+            raise ValueError("no resistor detected")
+
+        record['colours'] = _pipeline.sorted_colours()
+        record['confidences'] = _pipeline.colour_confidences()
+        record['resistance'] = _pipeline.resistance()
+
+    except Exception as error:
+        record['error'] = f"{type(error).__name__}: {error}"
+
+    record['timings'] = _pipeline.timings()
+    return record
+
+
+# writes records one at a time as JSON lines or CSV rows
+
+class RecordWriter:
+
+    def __init__(self, stream, output_format):
+        self.__stream = stream
+        self.__format = output_format
+        self.__csv = None
+
+        if output_format == 'csv':
+            self.__csv = csv.writer(stream)
+            self.__csv.writerow(['path', 'colours', 'confidences', 'resistance', 'error'] +
+                                [f'{stage}_seconds' for stage in RecognitionPipeline.stage_names])
+
+    def write(self, record):
+        if self.__csv is None:
+            self.__stream.write(json.dumps(record) + '\n')
+        else:
+            timings = record['timings']
+            self.__csv.writerow([record['path'], ' '.join(record['colours'] or []),
+                                 ' '.join(f'{confidence:.3f}' for confidence in record['confidences'] or []),
+                                 record['resistance'] or '',
+                                 record['error'] or ''] +
+                                [f"{timings[stage]:.6f}" if stage in timings else ''
+                                 for stage in RecognitionPipeline.stage_names])
+        self.__stream.flush()
+
+
+# recognises every image, streaming records in input order as they become available
+# trace_path appends the spans of every image to a JSON lines file, profile_path (in-process only)
+# writes cProfile statistics covering every image
+
+def run_batch(paths, writer, processes=None, chunksize=1, trace_path=None, profile_path=None):
+    if processes == 1 or profile_path is not None:
+        sinks = []
+        if trace_path is not None:
+            sinks.append(JsonLogSink(trace_path))
+        if profile_path is not None:
+            sinks.append(ProfileSink(profile_path, names=['batch.image']))
+
+        with tracing(*sinks):
+            for path in paths:
+                writer.write(recognise_image(path))
+        return
+
+    with multiprocessing.Pool(processes=processes, initializer=_init_worker, initargs=(trace_path,)) as pool:
+        # imap yields in submission order even though workers finish out of order
+        for record in pool.imap(recognise_image, paths, chunksize=chunksize):
+            writer.write(record)
+
+
+# command line entry point: resistor-recognition batch [options] PATH...
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="resistor-recognition batch",
+                                     description="Recognise resistors in stored images without a display")
+    parser.add_argument("inputs", nargs='+', help="image files, directories or glob patterns")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of worker processes (default: one per CPU)")
+    parser.add_argument("--chunksize", type=int, default=1, help="images handed to a worker at a time")
+    parser.add_argument("--format", choices=['jsonl', 'csv'], default='jsonl')
+    parser.add_argument("-o", "--output", help="file to write records to (default: standard output)")
+    parser.add_argument("--trace", help="append per-stage spans as JSON lines to this file")
+    parser.add_argument("--profile", help="write cProfile statistics to this file (runs in a single process)")
+    args = parser.parse_args(argv)
+
+    paths = find_images(args.inputs)
+    if not paths:
+        parser.error("no images found")
+
+    stream = sys.stdout if args.output is None else open(args.output, 'w', newline='')
+    try:
+        run_batch(paths, RecordWriter(stream, args.format), processes=args.jobs, chunksize=args.chunksize,
+                  trace_path=args.trace, profile_path=args.profile)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# import necessary libraries
+import numpy as np
+
+
+# reusable arrays for the intermediate images of a frame, handed to OpenCV through dst= arguments
+# a buffer is named by the step using it, so two steps that need images of the same shape at the same
+# time get separate arrays; each name keeps the largest block it has needed and hands out views of it,
+# so once the largest image has been seen a frame allocates nothing, even as the tracked region changes
+# size. A buffer's contents are overwritten the next time its step runs, so results that outlive the
+# frame must be copied. A pool belongs to one thread of work, e.g. one RecognitionPipeline
+
+class BufferPool:
+
+    def __init__(self):
+        self.__blocks = {}
+        self.__bytes_allocated = 0
+        self.__frame_start_bytes = 0
+        self.__frame_bytes = 0
+        self.__frames = 0
+
+    # contiguous array of the given shape and dtype for a step, allocating only when the step's block
+    # is too small for it
+
+    def get(self, name, shape, dtype=np.uint8):
+        dtype = np.dtype(dtype)
+        shape = tuple(shape)
+        size = int(np.prod(shape)) * dtype.itemsize
+        block = self.__blocks.get(name)
+        if block is None or block.nbytes < size:
+            block = np.empty(size, dtype=np.uint8)
+            self.__blocks[name] = block
+            self.__bytes_allocated += size
+        return block[:size].view(dtype).reshape(shape)
+
+    # same as get, with every element set to zero
+
+    def zeros(self, name, shape, dtype=np.uint8):
+        buffer = self.get(name, shape, dtype)
+        buffer.fill(0)
+        return buffer
+
+    # marks the start of a new frame, closing the count of bytes allocated for the previous one
+
+    def next_frame(self):
+        self.__frame_bytes = self.__bytes_allocated - self.__frame_start_bytes
+        self.__frame_start_bytes = self.__bytes_allocated
+        self.__frames += 1
+
+    # forgets every block, e.g. after unusually large frames
+
+    def clear(self):
+        self.__blocks = {}
+
+    # getters
+    def bytes_allocated(self):
+        return self.__bytes_allocated
+
+    # bytes allocated while processing the last finished frame
+    def bytes_last_frame(self):
+        return self.__frame_bytes
+
+    def bytes_per_frame(self):
+        return self.__frame_start_bytes / self.__frames if self.__frames else 0.0
+
+    def frames(self):
+        return self.__frames
+
+    def buffers_held(self):
+        return len(self.__blocks)
+
+    def bytes_held(self):
+        return sum(block.nbytes for block in self.__blocks.values())
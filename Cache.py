@@ -0,0 +1,158 @@
+# import necessary libraries
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import cv2 as cv
+
+# import classes self-created
+from Preprocessing import WhitebalanceReference
+from config import (
+    TEMPLATE_IMAGE, REFERENCE_IMAGE, RESULT_CACHE_SIZE, RESULT_CACHE_MAX_DISTANCE, RESULT_CACHE_PIXEL_TOLERANCE
+)
+
+
+# keeps the decoded calibration assets in memory, reloading a file only when its mtime changes
+
+class AssetCache:
+
+    # initialise with the asset paths, nothing is decoded until first use
+
+    def __init__(self, template_path=TEMPLATE_IMAGE, reference_path=REFERENCE_IMAGE):
+        self.__template_path = template_path
+        self.__reference_path = reference_path
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    # returns the cached value for a file, decoding it again if it changed on disk
+
+    def __load(self, name, path, decode):
+        modified = os.stat(path).st_mtime_ns
+
+        with self.__lock:
+            entry = self.__entries.get(name)
+            if entry is None or entry[0] != modified:
+                value = decode(path)
+                if value is None:
+                    raise ValueError(f"Could not decode image: {path}")
+                entry = (modified, value)
+                self.__entries[name] = entry
+
+        return entry[1]
+
+    # grayscale template used to locate the resistor
+
+    def template(self):
+        return self.__load('template', self.__template_path, lambda path: cv.imread(path, 0))
+
+    # reference image resized for white balancing, with its patch statistics precomputed
+
+    def whitebalance_reference(self):
+        return self.__load('reference', self.__reference_path, self.__prepare_reference)
+
+    @staticmethod
+    def __prepare_reference(path):
+        reference_image = cv.imread(path)
+        return None if reference_image is None else WhitebalanceReference(reference_image)
+
+    # forget every decoded asset so the next request reads from disk
+
+    def clear(self):
+        with self.__lock:
+            self.__entries = {}
+
+
+# shared cache used when no other is given
+default_assets = AssetCache()
+
+
+# remembers recognition results by a perceptual hash of the frame, so capturing the same
+# stationary resistor again returns the earlier result instead of running the pipeline
+# a stored result is reused when its hash differs in at most max_distance bits and no pixel of the
+# two thumbnails differs by more than pixel_tolerance; the hash alone cannot tell a single changed
+# band from camera noise, the thumbnails can. Entries are stored under the hash and a checksum of the
+# thumbnail, so two different frames with equal hashes are kept side by side rather than one replacing
+# the other. The least recently used result is evicted at capacity
+
+class ResultCache:
+
+    # thumbnail compared pixel by pixel; the hash is taken from a copy of half its size
+    thumbnail_size = (64, 48)
+
+    # brightness step between neighbouring hash pixels that sets a bit, well above camera noise
+    edge_threshold = 16
+
+    def __init__(self, capacity=RESULT_CACHE_SIZE, max_distance=RESULT_CACHE_MAX_DISTANCE,
+                 pixel_tolerance=RESULT_CACHE_PIXEL_TOLERANCE):
+        self.__capacity = capacity
+        self.__max_distance = max_distance
+        self.__pixel_tolerance = pixel_tolerance
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    # (hash, thumbnail, checksum) of a frame
+    # each bit says whether a colour channel rises (or falls) by more than edge_threshold from one
+    # pixel of the small copy to the next, so flat regions give stable zero bits whatever the noise
+
+    def key(self, frame):
+        thumbnail = cv.resize(frame, self.thumbnail_size, interpolation=cv.INTER_AREA)
+        small = cv.pyrDown(thumbnail).astype(np.int16)
+        steps = small[:, 1:] - small[:, :-1]
+        bits = np.concatenate([(steps > self.edge_threshold).ravel(), (steps < -self.edge_threshold).ravel()])
+        checksum = hashlib.blake2b(thumbnail.tobytes(), digest_size=8).digest()
+        return int.from_bytes(np.packbits(bits).tobytes(), 'big'), thumbnail, checksum
+
+    # result stored for the closest matching frame, or None
+
+    def get(self, key):
+        frame_hash, thumbnail, _ = key
+        with self.__lock:
+            # newest entries first, so the stable sort prefers the most recently used among equal distances
+            candidates = []
+            for entry_key in reversed(self.__entries):
+                distance = bin(entry_key[0] ^ frame_hash).count('1')
+                if distance <= self.__max_distance:
+                    candidates.append((distance, entry_key))
+
+            # closest hash first; a stored result is only returned for a thumbnail within the pixel tolerance
+            for distance, entry_key in sorted(candidates, key=lambda candidate: candidate[0]):
+                stored_thumbnail, value = self.__entries[entry_key]
+                if cv.norm(stored_thumbnail, thumbnail, cv.NORM_INF) <= self.__pixel_tolerance:
+                    self.__hits += 1
+                    self.__entries.move_to_end(entry_key)
+                    return value
+
+            self.__misses += 1
+            return None
+
+    def put(self, key, value):
+        frame_hash, thumbnail, checksum = key
+        entry_key = (frame_hash, checksum)
+        with self.__lock:
+            self.__entries[entry_key] = (thumbnail, value)
+            self.__entries.move_to_end(entry_key)
+            while len(self.__entries) > self.__capacity:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    # getters
+    def hits(self):
+        return self.__hits
+
+    def misses(self):
+        return self.__misses
+
+    def evictions(self):
+        return self.__evictions
@@ -0,0 +1,163 @@
+# import necessary libraries
+import threading
+import time
+
+import cv2 as cv
+
+
+# keeps reading frames on its own thread and holds only the newest one,
+# so the preview and captures never wait on camera I/O
+
+class CameraGrabber:
+
+    # initialise with a camera index or video file path (opened with cv.VideoCapture),
+    # or any object with read() and release() such as FrameSequenceSource
+    # interval paces the reads, which is only needed for sources that are not live cameras
+    # raises OSError when a camera or video file cannot be opened
+
+    def __init__(self, source=0, interval=0.0, max_failures=30):
+        if isinstance(source, (int, str)):
+            capture = cv.VideoCapture(source)
+            if not capture.isOpened():
+                capture.release()
+                raise OSError(f"Could not open camera {source}")
+            source = capture
+
+        # a VideoCapture can read into an existing array, which is done with frames nobody took
+        self.__reads_into = isinstance(source, cv.VideoCapture)
+        self.__source = source
+        self.__interval = interval
+        self.__max_failures = max_failures
+        self.__lock = threading.Lock()
+        self.__frame = None
+        self.__frame_id = 0
+        self.__read_id = 0
+        self.__dropped = 0
+        self.__recycled = 0
+        self.__running = False
+        self.__thread = None
+
+    # starts the capture thread
+
+    def start(self):
+        if self.__thread is None:
+            self.__running = True
+            self.__thread = threading.Thread(target=self.__run, name='camera-grabber', daemon=True)
+            self.__thread.start()
+        return self
+
+    # reads until stopped or the source keeps failing (e.g. the end of a video file), then releases the
+    # source itself, so a read still blocked when stop() gives up never runs on a released source
+    # a frame replaced before anyone took it is read into again, as nothing else can hold it; frames
+    # handed out by latest() are never written to, since the preview or an analysis may still use them
+
+    def __run(self):
+        try:
+            self.__read_frames()
+        finally:
+            self.__running = False
+            self.__source.release()
+
+    def __read_frames(self):
+        failures = 0
+        spare = None
+        while self.__running:
+            start = time.perf_counter()
+            if spare is not None:
+                ret, frame = self.__source.read(spare)
+                if ret and frame is spare:
+                    self.__recycled += 1
+                spare = None
+            else:
+                ret, frame = self.__source.read()
+
+            if not ret:
+                failures += 1
+                if failures >= self.__max_failures:
+                    break
+                time.sleep(0.01)
+                continue
+            failures = 0
+
+            with self.__lock:
+                # a frame nobody read is being replaced
+                if self.__frame_id > self.__read_id:
+                    self.__dropped += 1
+                    if self.__reads_into:
+                        spare = self.__frame
+                self.__frame = frame
+                self.__frame_id += 1
+
+            remaining = self.__interval - (time.perf_counter() - start)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    # newest frame and its sequence number (0 and None before the first frame)
+    # every caller (the preview, captures and live recognition alike) marks the frame as taken
+
+    def latest(self):
+        with self.__lock:
+            self.__read_id = self.__frame_id
+            return self.__frame_id, self.__frame
+
+    # same contract as cv.VideoCapture.read, without blocking
+
+    def read(self):
+        _, frame = self.latest()
+        return frame is not None, frame
+
+    # getters
+    def isOpened(self):
+        return self.__running
+
+    def frames_read(self):
+        with self.__lock:
+            return self.__frame_id
+
+    # frames replaced before any caller of latest() took them, not frames a particular consumer
+    # such as the preview missed
+    def dropped_frames(self):
+        with self.__lock:
+            return self.__dropped
+
+    # frames read into the array of a dropped frame instead of a new one
+    def recycled_frames(self):
+        return self.__recycled
+
+    # stops the thread, which releases the source once its last read returns; a grabber that was
+    # never started releases the source here
+
+    def stop(self, timeout=1.0):
+        self.__running = False
+        if self.__thread is not None:
+            self.__thread.join(timeout)
+        else:
+            self.__source.release()
+
+    release = stop
+
+
+# stands in for a camera by returning frames from a list, for tests and benchmarks
+
+class FrameSequenceSource:
+
+    def __init__(self, frames, loop=True):
+        self.__frames = list(frames)
+        self.__loop = loop
+        self.__index = 0
+
+    def read(self):
+        if self.__index >= len(self.__frames):
+            if not self.__loop or not self.__frames:
+                return False, None
+            self.__index = 0
+
+        frame = self.__frames[self.__index]
+        self.__index += 1
+        return True, frame
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
@@ -0,0 +1,123 @@
+# import necessary libraries
+import numpy as np
+
+
+# decodes resistor colour codes with lookup tables, a whole array of band sequences at a time
+# 4 bands: digit, digit, multiplier, tolerance
+# 5 bands: digit, digit, digit, multiplier, tolerance
+# 6 bands: digit, digit, digit, multiplier, tolerance, temperature coefficient
+
+# every colour a band can have, in code order; each table below is indexed by these codes
+COLOURS = ('black', 'brown', 'red', 'orange', 'yellow', 'green', 'blue', 'violet', 'grey', 'white',
+           'gold', 'silver', 'none')
+
+# codes of names that are not colours, and of positions past the end of a shorter sequence
+UNKNOWN = -1
+MISSING = -2
+
+# colour names to codes, accepting the American spelling of grey
+COLOUR_CODES = dict((colour, code) for code, colour in enumerate(COLOURS))
+COLOUR_CODES['gray'] = COLOUR_CODES['grey']
+
+# significant digit of each colour, -1 where a colour has none
+DIGITS = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, -1, -1, -1], dtype=np.int64)
+
+# power of ten of each multiplier colour, with a sentinel where a colour is not a multiplier
+NO_EXPONENT = 99
+EXPONENTS = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 9, -1, -2, NO_EXPONENT], dtype=np.int64)
+
+# tolerance in percent (IEC 60062), NaN where a colour is not a tolerance
+TOLERANCES = np.array([np.nan, 1, 2, 0.05, 0.02, 0.5, 0.25, 0.1, 0.01, np.nan, 5, 10, 20], dtype=np.float64)
+
+# temperature coefficient in ppm/K (IEC 60062), NaN where a colour is not a coefficient
+TEMPCOS = np.array([250, 100, 50, 15, 25, 20, 10, 5, 1, np.nan, np.nan, np.nan, np.nan], dtype=np.float64)
+
+# layout of each supported band count: number of digits and whether a temperature coefficient follows
+LAYOUTS = {4: (2, False), 5: (3, False), 6: (3, True)}
+MAX_BANDS = 6
+
+# one decoded sequence; tempco is NaN without a temperature coefficient band
+RESULT_DTYPE = np.dtype([('ohms', np.float64), ('tolerance', np.float64), ('tempco', np.float64),
+                         ('bands', np.int8), ('valid', np.bool_)])
+
+
+# band colour names to a (sequences, MAX_BANDS) array of codes, padded with MISSING
+# a batch of reads repeats a few distinct sequences many times, so each distinct one is encoded once
+
+def encode(sequences):
+    distinct = {}
+    inverse = np.fromiter((distinct.setdefault(tuple(sequence), len(distinct)) for sequence in sequences),
+                          dtype=np.int64)
+
+    # a sequence longer than any layout keeps an extra band so it counts as invalid
+    width = MAX_BANDS + 1 if any(len(sequence) > MAX_BANDS for sequence in distinct) else MAX_BANDS
+    distinct_codes = np.full((len(distinct), width), MISSING, dtype=np.int64)
+    for row, sequence in enumerate(distinct):
+        for column, name in enumerate(sequence[:width]):
+            distinct_codes[row, column] = COLOUR_CODES.get(str(name).lower(), UNKNOWN)
+    return distinct_codes[inverse]
+
+
+# decodes many band sequences, given as colour names or as codes from encode(), into RESULT_DTYPE records
+# sequences of unsupported length or with a colour out of place are returned with valid False
+
+def decode_many(sequences):
+    codes = sequences if isinstance(sequences, np.ndarray) and sequences.dtype.kind == 'i' else encode(sequences)
+    codes = np.atleast_2d(codes)
+
+    results = np.zeros(len(codes), dtype=RESULT_DTYPE)
+    results['ohms'] = np.nan
+    results['tolerance'] = np.nan
+    results['tempco'] = np.nan
+    lengths = (codes != MISSING).sum(axis=1)
+    results['bands'] = lengths
+
+    # unknown and missing codes index the tables through this copy, then fail validation
+    lookup = np.where(codes < 0, len(COLOURS) - 1, codes)
+    known = codes >= 0
+
+    for bands, (digit_count, has_tempco) in LAYOUTS.items():
+        rows = np.flatnonzero(lengths == bands)
+        if len(rows) == 0:
+            continue
+
+        row_codes = lookup[rows]
+        row_known = known[rows, :bands].all(axis=1)
+
+        digits = DIGITS[row_codes[:, :digit_count]]
+        value = (digits * 10 ** np.arange(digit_count - 1, -1, -1)).sum(axis=1).astype(np.float64)
+        exponent = EXPONENTS[row_codes[:, digit_count]]
+        tolerance = TOLERANCES[row_codes[:, digit_count + 1]]
+        tempco = TEMPCOS[row_codes[:, digit_count + 2]] if has_tempco else np.full(len(rows), np.nan)
+
+        valid = row_known & (digits >= 0).all(axis=1) & (exponent != NO_EXPONENT) & ~np.isnan(tolerance)
+        if has_tempco:
+            valid &= ~np.isnan(tempco)
+
+        # dividing for fractional multipliers keeps values such as 4.7 exact
+        ohms = np.where(exponent >= 0, value * 10.0 ** np.maximum(exponent, 0),
+                        value / 10.0 ** np.maximum(-exponent, 0))
+
+        results['ohms'][rows] = np.where(valid, ohms, np.nan)
+        results['tolerance'][rows] = np.where(valid, tolerance, np.nan)
+        results['tempco'][rows] = np.where(valid, tempco, np.nan)
+        results['valid'][rows] = valid
+
+    return results
+
+
+# decodes one band sequence into a RESULT_DTYPE record
+
+def decode(colours):
+    return decode_many([colours])[0]
+
+
+# human readable form of a decoded record, e.g. '4700 Ohms +/- 5 %'
+
+def format_resistance(result):
+    ohms = float(result['ohms'])
+    text = f"{int(ohms)} Ohms" if ohms.is_integer() else f"{ohms:g} Ohms"
+    text += f" +/- {float(result['tolerance']):g} %"
+    if not np.isnan(result['tempco']):
+        text += f" {float(result['tempco']):g} ppm/K"
+    return text
@@ -1,79 +1,21 @@
 # import necessary libraries
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
-import numpy as np
-import cv2 as cv
 import os
+import threading
 
 # import classes self-created
-from Preprocessing import RotateImage, CropImage, WhitebalanceImage
-from Bands import (
-    ColourBands, GoldBand, BrownBands, BlackBands, GreenBands, YellowBands,
-    BlueBands, OrangeBands, GreyBands, RedBands, VioletBands, WhiteBands
-)
-from Analysis import UniqueBands, SortBands, SortColours
+# the vision stack (cv2, numpy, PIL and the recognition classes) is imported when the camera screen
+# first opens, so the homepage does not wait for it
+from Artwork import photo_image
 from config import *
 
 
-# calculates the resistance of the resistor
-class ResistanceCalculation:
-    # initialise with bands and colour values
-    def __init__(self, band1, band2, band3, band4):
-        self.__band1 = band1
-        self.__band2 = band2
-        self.__band3 = band3
-        self.__band4 = band4
-
-        # dictionaries with key-value pairs of colour representation
-
-        # first two bands represent numeric digit values
-        self.__colour_digits = {'black': '0',
-                              'brown': '1',
-                              'red': '2',
-                              'orange': '3',
-                              'yellow': '4',
-                              'green': '5',
-                              'blue': '6',
-                              'violet': '7',
-                              'gray': '8',
-                              'white': '9'}
-
-        # third band represents power of 10
-
-        self.__multipliers = {'black': 1,
-                            'brown': 10,
-                            'red': 100,
-                            'orange': 1000,
-                            'yellow': 10000,
-                            'green': 100000,
-                            'blue': 1000000,
-                            'violet': 10000000,
-                            'gray': 100000000,
-                            'white': 1000000000}
-
-        # fourth band represents the deviation from calculated value
-
-        self.__tolerances = {'brown': '+/- 1 %',
-                           'red': '+/- 2 %',
-                           'green': "+/- 0.5 %",
-                           'blue': '+/- 0.25 %',
-                           'violet': '+/- 0.1 %',
-                           'gold': '+/- 5 %',
-                           'silver': '+/- 10 %',
-                           'none': '+/-20 %'}
-
-    def findResistance(self):
-        # calculate resistance
-        if self.__band1 in self.__colour_digits and self.__band2 in self.__colour_digits and self.__band3 in self.__multipliers and self.__band4 in self.__tolerances:
-            tensdigit = self.__colour_digits.get(self.__band1)
-            onesdigit = self.__colour_digits.get(self.__band2)
-            multiplier = self.__multipliers.get(self.__band3)
-            tolerance = self.__tolerances.get(self.__band4)
-            digits = int(tensdigit + onesdigit)
-            resistance = str(digits * multiplier) + " Ohms " + tolerance
-
-        return resistance
+# imports the vision stack on a background thread while the homepage is shown, so pressing
+# Start finds it already loaded
+
+def _preload_vision_stack():
+    import Camera, Live, Pipeline, Preview, Worker
 
 
 # creates user interface
@@ -86,21 +28,33 @@ class GUI:
         self.__img = None
         self.__root = root
         self.__camera_label = None
+        self.__status_label = None
+        self.__camera = None
+        self.__preview_frame_id = 0
+        self.__preview = None
+        self.__pipeline = None
+        self.__results = None
+        self.__worker = None
+        self.__live = None
+        self.__live_tracker = None
+        self.__live_pipeline = None
+        self.__live_button = None
+        self.__live_label = None
         self.__gui_frame = tk.Frame(self.__root, bg='white')
 
-        # Load GUI images if available
+        # Load GUI images if available, at the size they are shown at
         self.__background_image = None
         self.__image = None
         
         try:
             if os.path.exists(BACKGROUND_IMAGE):
-                self.__background_image = tk.PhotoImage(file=BACKGROUND_IMAGE)
+                self.__background_image = photo_image(BACKGROUND_IMAGE, size=(WINDOW_WIDTH, WINDOW_HEIGHT))
         except Exception as e:
             print(f"Background image not found: {BACKGROUND_IMAGE}")
             
         try:
             if os.path.exists(LOGO_IMAGE):
-                self.__image = tk.PhotoImage(file=LOGO_IMAGE)
+                self.__image = photo_image(LOGO_IMAGE, subsample=LOGO_SUBSAMPLE)
         except Exception as e:
             print(f"Logo image not found: {LOGO_IMAGE}")
 
@@ -139,7 +93,6 @@ class GUI:
         
         # Add logo image or fallback
         if self.__image:
-            self.__image = self.__image.subsample(4, 4)
             image_label = tk.Label(self.__gui_frame, image=self.__image)
             image_label.place(x=250, y=10)
         elif not self.__background_image:
@@ -175,6 +128,11 @@ class GUI:
 
         self.__set_window_size(self.__root, self.__window_width, self.__window_height)
 
+        # load the vision stack once the homepage has been drawn
+        if STARTUP_PRELOAD:
+            self.__root.after_idle(lambda: threading.Thread(target=_preload_vision_stack, name='preload',
+                                                            daemon=True).start())
+
     # entering region of button
 
     def __on_enter(self, event):
@@ -195,22 +153,36 @@ class GUI:
         y = (screen_height - height) // 2
         window.geometry(f'{width}x{height}+{x}+{y}')
 
-    # display live camera feed
+    # display live camera feed from the newest grabbed frame
     def __show_camera_feed(self):
-        ret, camera_frame = cap.read()
-        if ret:
-            camera_frame = cv.cvtColor(camera_frame, cv.COLOR_BGR2RGB)
+        # tells the user instead of leaving the preview blank
+        if self.__camera is None or not self.__camera.isOpened():
+            message = (f"Camera {CAMERA_INDEX} could not be opened" if self.__camera is None
+                       else "Camera stopped delivering frames")
+            self.__camera_label.config(image='', text=message, font=("Helvetica", 14), fg='darkred')
+            return
+
+        frame_id, camera_frame = self.__camera.latest()
+
+        # only redraw when the grabber has a frame not shown yet, into the same PhotoImage
+        if camera_frame is not None and frame_id != self.__preview_frame_id:
+            self.__preview_frame_id = frame_id
+            if self.__preview.render(camera_frame):
+                self.__camera_label.config(image=self.__preview.photo())
 
-            # show camera feed using label on window at configured intervals
-            photo = ImageTk.PhotoImage(image=Image.fromarray(camera_frame))
-            self.__camera_label.config(image=photo)
-            self.__camera_label.image = photo
-            self.__camera_label.after(CAMERA_UPDATE_INTERVAL, self.__show_camera_feed)
+        # show camera feed using label on window at configured intervals
+        self.__camera_label.after(CAMERA_UPDATE_INTERVAL, self.__show_camera_feed)
 
     # state after clicking start button
 
     def __start_clicked(self):
         global camera_window
+        from Camera import CameraGrabber
+        from Preview import PreviewRenderer
+        from Worker import AnalysisWorker
+
+        self.__prepare_recognition()
+
         # new window to show camera feed
         camera_window = tk.Toplevel()
         camera_window.title("Camera Feed")
@@ -220,15 +192,20 @@ class GUI:
         gui_frame = tk.Frame(camera_window, bg='white')
         gui_frame.place(relwidth=1, relheight=1)
 
-        # capture camera feed
+        # capture camera feed on its own thread
 
-        global cap
-        cap = cv.VideoCapture(0)
+        if self.__camera is None or not self.__camera.isOpened():
+            try:
+                self.__camera = CameraGrabber(CAMERA_INDEX).start()
+            except OSError as error:
+                print(error)
+                self.__camera = None
 
         # camera feed via label in frame
         self.__camera_label = tk.Label(gui_frame)
         self.__camera_label.place(x=10, y=10, width=self.__frame_width, height=
                                   self.__frame_height)
+        self.__preview = PreviewRenderer(self.__frame_width, self.__frame_height)
 
         # calls method to display camera feed
         self.__show_camera_feed()
@@ -240,162 +217,175 @@ class GUI:
                                     style="TButton")
         capture_button.place(x=330, y=self.__frame_height + 20)
 
-    # captures specific frame after button pressed
-
-    def __capture_image(self):
-        if cap.isOpened():
-            ret, frame = cap.read()
-
-            # displays captured frame
-
-            if ret:
-                self.__show_captured_frame(frame)
-
-    # closes window if exit button pressed
-
-    def __exit_clicked(self):
-        if 'cap' in globals():
-            cap.release()
-        self.__root.destroy()
-
-    # rotates image using calls to RotateImage methods
-
-    def __rotation(self, img):
-        gray_img = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
-
-        _, thresh = cv.threshold(gray_img, 140, 255, cv.THRESH_BINARY_INV)
-        contours, hierarchy = cv.findContours(thresh, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
-
-        img_to_rotate = RotateImage(img)
-        img_to_rotate._set_bounding_rectangle(contours)
-        img_to_rotate._set_rotation_angle()
-        img_to_rotate._set_rotation_matrix()
-        rotated_image = img_to_rotate._get_rotated_image()
-
-        return rotated_image
-
-    # crops resistor image using calls to CropImage methods
-
-    def __cropping(self):
-        template = cv.imread(TEMPLATE_IMAGE, 0)
-
-        # uses results from rotation
-        img_to_crop = CropImage(self.__rotation(self.__img), template)
-        img_cropped = img_to_crop.get_cropped_image()
-
-        return img_cropped
-
-    # white balances image calling WhitebalanceImage methods
+        # creates button to switch continuous recognition on and off
 
-    def __whitebalancing(self):
-        reference_image = cv.imread(REFERENCE_IMAGE)
+        self.__live_button = ttk.Button(gui_frame, text="Live Mode", command=self.__toggle_live, width=12,
+                                        style="TButton")
+        self.__live_button.place(x=10, y=self.__frame_height + 20)
 
-        # uses results from cropping
-        img_to_whitebalance = WhitebalanceImage(self.__cropping(), reference_image)
-        img = img_to_whitebalance.final_whitebalanced()
-        cv.imwrite(os.path.join(ASSETS_DIR, 'whitebalanced_image.jpg'), img)
-        return img
+        # shows whether a capture is being analysed
 
-    # attempts to find colour bands using ColourBand child class methods
+        self.__status_label = tk.Label(gui_frame, text="", font=("Helvetica", 12), bg='white', fg='darkblue')
+        self.__status_label.place(x=500, y=self.__frame_height + 22)
 
-    def __findbands(self):
+        # shows the live reading over the camera feed
 
-        # analyses each colour, creates final image of all identified bands
+        self.__live_label = tk.Label(gui_frame, text="", font=("Helvetica", 12), bg='lightblue', fg='black')
 
-        # uses whitebalancing
+        # analysis runs on a worker thread, results are collected by polling
 
-        combined_image = np.zeros_like(self.__whitebalancing())
-        resistor_img = self.__whitebalancing()
+        if self.__worker is None:
+            self.__worker = AnalysisWorker(self.__analyse, policy=CAPTURE_POLICY, max_queued=CAPTURE_QUEUE_SIZE)
+            self.__poll_results()
 
-        # adds to the previous combined image each time
+    # creates the recognition pipelines and caches the first time the camera screen opens
 
-        gold_band = GoldBand(resistor_img, combined_image)
-        self.__gold_contours, combined_image = gold_band.colour_band_image()
+    def __prepare_recognition(self):
+        if self.__pipeline is not None:
+            return
+        from Cache import ResultCache
+        from Pipeline import RecognitionPipeline
+        from Tracking import ResistorTracker
 
-        brown_band = BrownBands(resistor_img, combined_image)
-        self.__brown_contours, combined_image = brown_band.colour_band_image()
+        self.__pipeline = RecognitionPipeline(session_whitebalance=WHITEBALANCE_SESSION_GAINS)
+        self.__results = ResultCache() if RESULT_CACHE_ENABLED else None
+        self.__live_tracker = ResistorTracker() if LIVE_TRACKING else None
+        self.__live_pipeline = RecognitionPipeline(session_whitebalance=WHITEBALANCE_SESSION_GAINS,
+                                                   tracker=self.__live_tracker)
 
-        green_band = GreenBands(resistor_img, combined_image)
-        self.__green_contours, combined_image = green_band.colour_band_image()
-
-        violet_band = VioletBands(resistor_img, combined_image)
-        self.__violet_contours, combined_image = violet_band.colour_band_image()
-
-        yellow_band = YellowBands(resistor_img, combined_image)
-        self.__yellow_contours, combined_image = yellow_band.colour_band_image()
-
-        red_band = RedBands(resistor_img, combined_image)
-        self.__red_contours, combined_image = red_band.colour_band_image()
-
-        black_band = BlackBands(resistor_img, combined_image)
-        self.__black_contours, combined_image = black_band.colour_band_image()
-
-        orange_band = OrangeBands(resistor_img, combined_image)
-        self.__orange_contours, combined_image = orange_band.colour_band_image()
-
-        blue_band = BlueBands(resistor_img, combined_image)
-        self.__blue_contours, combined_image = blue_band.colour_band_image()
-
-        white_band = WhiteBands(resistor_img, combined_image)
-        self.__white_contours, combined_image = white_band.colour_band_image()
-        return combined_image
-
-    # sorts these colour bands and returns the colours
-
-    def __sorting(self):
-
-        # uses findbands
-
-        # finds contours of combined image using thresholding
+    # captures specific frame after button pressed
 
-        gray_combined = cv.cvtColor(self.__findbands(), cv.COLOR_BGR2GRAY)
+    def __capture_image(self):
+        if self.__camera is not None and self.__camera.isOpened():
+            ret, frame = self.__camera.read()
 
-        _, combined_threshold = cv.threshold(gray_combined, 1, 255, cv.THRESH_BINARY)
+            # hands the captured frame to the worker
 
-        # Find contours in the thresholded image
-        contours, _ = cv.findContours(combined_threshold, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+            if ret:
+                if not self.__worker.submit(frame):
+                    print('Capture dropped, analysis still in progress')
+                self.__update_status()
+
+    # shows the analysing state and how many captures are waiting
+
+    def __update_status(self):
+        pending = self.__worker.pending()
+        if pending == 0:
+            text = ""
+        elif pending == 1:
+            text = "Analysing..."
+        else:
+            text = f"Analysing... ({pending - 1} queued)"
+        self.__status_label.config(text=text)
 
-        # calls UniqueBands methods to ensure individual bands are not repeated
+    # collects finished analyses on the Tk thread and displays them
 
-        select_unique_bands = UniqueBands(contours)
-        selected_contours = select_unique_bands.find_unique_bands()
-        print(len(selected_contours))
-        combined_image = np.zeros_like(self.__findbands())
-        cv.drawContours(combined_image, selected_contours, -1, (0, 255, 0), 2)
+    def __poll_results(self):
+        # a result that cannot be shown must not stop the results after it from being collected
+        try:
+            for frame, text, error in self.__worker.poll():
+                try:
+                    if error is None:
+                        self.__show_captured_frame(frame, text)
+                    else:
+                        print('Analysis failed:', error)
+                        self.__show_error_frame(frame)
+                except Exception as display_error:
+                    print('Could not display result:', display_error)
+
+            if self.__status_label is not None and self.__status_label.winfo_exists():
+                self.__update_status()
+            if self.__live is not None and self.__live_label.winfo_exists():
+                self.__update_live_reading()
+        except Exception as poll_error:
+            print('Result polling failed:', poll_error)
+        finally:
+            self.__root.after(RESULT_POLL_INTERVAL, self.__poll_results)
+
+    # starts or stops continuous recognition of the camera feed
+
+    def __toggle_live(self):
+        from Live import LiveRecognition
+
+        if self.__live is None and (self.__camera is None or not self.__camera.isOpened()):
+            return
+        if self.__live is None:
+            # the resistor may have moved since live mode last ran
+            if self.__live_tracker is not None:
+                self.__live_tracker.lose()
+            self.__live = LiveRecognition(self.__camera, self.__analyse_live, stride=LIVE_FRAME_STRIDE,
+                                          max_stride=LIVE_MAX_FRAME_STRIDE, vote_window=LIVE_VOTE_WINDOW).start()
+            self.__live_button.configure(text="Stop Live")
+            self.__live_label.place(x=10, y=10)
+            self.__live_label.config(text="Live: reading...")
+        else:
+            # waits for the frame being analysed, so the live pipeline is idle before live mode can restart
+            self.__live.stop()
+            self.__live = None
+            self.__live_button.configure(text="Live Mode")
+            self.__live_label.place_forget()
 
-        # sorts bands based on x values
-        sorted_bands = SortBands(selected_contours)
-        sorted_contours = sorted_bands.merge_sort_contours()
-        colour_sort = SortColours(sorted_contours, self.__orange_contours, self.__red_contours, self.__green_contours, self.__blue_contours,
-                                  self.__yellow_contours, self.__black_contours, self.__brown_contours, self.__gold_contours, self.__white_contours, self.__violet_contours)
+    # band colours of one live frame (called on the live recognition thread)
 
-        # creates an array of the colours in the resistor
+    def __analyse_live(self, frame):
+        pipeline = self.__live_pipeline
+        pipeline.load_frame(frame)
+        if not pipeline.resistor_detected():
+            return None
+        return pipeline.sorted_colours()
 
-        sorted_contours_colours = colour_sort.colour_assignment()
+    # shows the voted resistance and the achieved analysis rate
 
-        return sorted_contours_colours
+    def __update_live_reading(self):
+        from Analysis import ResistanceCalculation
 
+        colours = self.__live.stable_colours()
+        if colours is None:
+            reading = "reading..."
+        else:
+            try:
+                reading = ResistanceCalculation(*colours).findResistance()
+            except ValueError:
+                reading = "unrecognised bands " + ", ".join(colours)
+        self.__live_label.config(text=f"Live: {reading}   ({self.__live.analysis_fps():.1f} analyses/s)")
 
-    # finds the resistance value to be output
+    # closes window if exit button pressed
 
-    def __processing(self, contours):
-        if len(contours) > 0:
-            # calls sorting method
-            sorted_contours_colours = self.__sorting()
+    def __exit_clicked(self):
+        if self.__live is not None:
+            self.__live.stop()
+        if self.__worker is not None:
+            self.__worker.stop(timeout=0)
+        if self.__camera is not None:
+            print('Camera frames read:', self.__camera.frames_read(),
+                  'dropped (replaced before anything took them):', self.__camera.dropped_frames(),
+                  'recycled:', self.__camera.recycled_frames())
+            print(f'Preview: {self.__preview.fps():.1f} frames/s, '
+                  f'{self.__preview.render_time() * 1000:.2f} ms per frame')
+            self.__camera.stop()
+        if self.__results is not None:
+            print('Result cache hits:', self.__results.hits(), 'misses:', self.__results.misses(),
+                  'evictions:', self.__results.evictions())
+        for name, pipeline in (('Capture', self.__pipeline), ('Live', self.__live_pipeline)):
+            if pipeline is not None and pipeline.buffer_pool() is not None:
+                pool = pipeline.buffer_pool()
+                print(f'{name} pipeline buffers: {pool.bytes_held()} bytes held, '
+                      f'{pool.bytes_per_frame():.0f} bytes allocated per frame, {pool.bytes_last_frame()} last frame')
+        self.__root.destroy()
 
-            # ensures gold band is always at the right end
+    # finds the resistance value to be output, running each pipeline stage once
 
-            if sorted_contours_colours[0] == 'gold':
-                sorted_contours_colours.reverse()
+    def __processing(self, pipeline):
+        import cv2 as cv
 
-            print('Colours in order:', sorted_contours_colours)
+        if pipeline.resistor_detected():
+            # writes the white balanced resistor for inspection
+            cv.imwrite(os.path.join(ASSETS_DIR, 'whitebalanced_image.jpg'), pipeline.whitebalanced_image())
 
-            # finds resistance using ResistanceCalculation class method calls
-            global text
+            print('Colours in order:', pipeline.sorted_colours())
 
-            resistance = ResistanceCalculation(sorted_contours_colours[0],sorted_contours_colours[1],
-                                               sorted_contours_colours[2],sorted_contours_colours[3])
-            text = 'Resistance Value: ' + resistance.findResistance()
+            # finds resistance using the decoding stage
+            text = 'Resistance Value: ' + pipeline.resistance()
 
         else:
 
@@ -405,66 +395,78 @@ class GUI:
         print(text)
         return text
 
-    # displays the captured frame with resistance
+    # runs the recognition stages on the captured frame (called on the worker thread)
 
-    def __show_captured_frame(self, captured_frame):
+    def __analyse(self, captured_frame):
+        self.__img = captured_frame
 
-        try:
-            # finds contours using thresholding and colour space conversion
-            self.__img = captured_frame
-            img = self.__img
+        # a capture looking the same as a recent one gets that capture's result
+        if self.__results is not None:
+            key = self.__results.key(captured_frame)
+            cached = self.__results.get(key)
+            if cached is not None:
+                colours, text = cached
+                print('Colours in order:', colours, '(unchanged capture)')
+                print(text)
+                return text
+
+        pipeline = self.__pipeline
+        pipeline.load_frame(self.__img)
 
-            # Convert the image to grayscale
-            gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
+        # uses call to processing to find resistance value
 
-            # Threshold the image
-            ret, threshold = cv.threshold(gray, THRESHOLD_VALUE, 255, cv.THRESH_BINARY_INV)
+        text = self.__processing(pipeline)
 
-            # Find contours
-            contours, hierarchy = cv.findContours(threshold, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
-            contours = [contour for contour in contours if cv.contourArea(contour) > MIN_CONTOUR_AREA]
+        # only successful readings are remembered, so a failed capture is always retried
+        if self.__results is not None and pipeline.resistor_detected():
+            self.__results.put(key, (pipeline.sorted_colours(), text))
+        return text
 
-            # uses call to processing to find resistance value
+    # displays the captured frame with resistance
 
-            self.__processing(contours)
+    def __show_captured_frame(self, captured_frame, text):
+        from PIL import Image, ImageTk
+        import cv2 as cv
 
-            # creates new window displaying the captured frame and resistance output
+        # creates new window displaying the captured frame and resistance output
 
-            captured_frame = cv.cvtColor(captured_frame, cv.COLOR_BGR2RGB)
-            photo = ImageTk.PhotoImage(image=Image.fromarray(captured_frame))
+        captured_frame = cv.cvtColor(captured_frame, cv.COLOR_BGR2RGB)
+        photo = ImageTk.PhotoImage(image=Image.fromarray(captured_frame))
 
-            # creates new window
-            captured_frame_window = tk.Toplevel()
-            captured_frame_window.title("Resistance Value Output")
+        # creates new window
+        captured_frame_window = tk.Toplevel()
+        captured_frame_window.title("Resistance Value Output")
 
+        # displays using a label
 
-            # displays using a label
+        image_label = tk.Label(captured_frame_window, image=photo)
+        image_label.image = photo  # Reference to keep the image alive
+        image_label.pack()
 
-            image_label = tk.Label(captured_frame_window, image=photo)
-            image_label.image = photo  # Reference to keep the image alive
-            image_label.pack()
+        text_label = tk.Label(captured_frame_window, text=text, font=("Helvetica", 12),
+                              bg='lightblue', fg='black')
+        text_label.pack()
 
-            text_label = tk.Label(captured_frame_window, text=text, font=("Helvetica", 12),
-                                  bg='lightblue', fg='black')
-            text_label.pack()
+    # displays the captured frame with the "Try Again" message when analysis failed
 
-        except Exception as e:
+    def __show_error_frame(self, captured_frame):
+        from PIL import Image, ImageTk
+        import cv2 as cv
 
-            # If an error occurs, display a new window with the "Try Again" message
-            captured_frame = cv.cvtColor(captured_frame, cv.COLOR_BGR2RGB)
-            photo = ImageTk.PhotoImage(image=Image.fromarray(captured_frame))
+        captured_frame = cv.cvtColor(captured_frame, cv.COLOR_BGR2RGB)
+        photo = ImageTk.PhotoImage(image=Image.fromarray(captured_frame))
 
-            # creates new window
+        # creates new window
 
-            error_window = tk.Toplevel()
-            error_window.title("Error")
+        error_window = tk.Toplevel()
+        error_window.title("Error")
 
-            # displays using a label
+        # displays using a label
 
-            image_label = tk.Label(error_window, image=photo)
-            image_label.image = photo
-            image_label.pack()
+        image_label = tk.Label(error_window, image=photo)
+        image_label.image = photo
+        image_label.pack()
 
-            error_label = tk.Label(error_window, text="Oops, Please Try Again :)",
-                                   font=("Helvetica", 12), bg='lightcoral', fg='black')
-            error_label.pack()
+        error_label = tk.Label(error_window, text="Oops, Please Try Again :)",
+                               font=("Helvetica", 12), bg='lightcoral', fg='black')
+        error_label.pack()
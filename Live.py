@@ -0,0 +1,142 @@
+# import necessary libraries
+import threading
+import time
+from collections import Counter, deque
+
+
+# majority vote over the band sequences read from the most recent frames
+
+class BandVote:
+
+    # initialise with how many recent readings take part in the vote
+
+    def __init__(self, window):
+        self.__readings = deque(maxlen=window)
+
+    # adds one reading, None meaning the frame gave no sequence
+
+    def add(self, colours):
+        self.__readings.append(None if colours is None else tuple(colours))
+
+    # sequence read in more than half of the window, or None while there is no majority
+
+    def stable(self):
+        if len(self.__readings) < self.__readings.maxlen:
+            return None
+
+        colours, votes = Counter(self.__readings).most_common(1)[0]
+        if colours is None or votes <= len(self.__readings) // 2:
+            return None
+        return list(colours)
+
+    def clear(self):
+        self.__readings.clear()
+
+
+# runs recognition continuously on every Nth camera frame and votes on the results
+
+class LiveRecognition:
+
+    # initialise with a CameraGrabber and a function returning the band colours of a frame
+    # stride is the minimum number of new frames between analyses; it grows up to max_stride
+    # when analysis falls behind the camera and shrinks back once it catches up
+
+    def __init__(self, camera, analyse, stride=5, max_stride=60, vote_window=5):
+        self.__camera = camera
+        self.__analyse = analyse
+        self.__min_stride = stride
+        self.__max_stride = max_stride
+        self.__stride = stride
+        self.__vote = BandVote(vote_window)
+        self.__lock = threading.Lock()
+        self.__analysed = 0
+        self.__skipped = 0
+        self.__analysis_fps = 0.0
+        self.__running = False
+        self.__thread = None
+
+    # starts the analysis thread
+
+    def start(self):
+        if self.__thread is None:
+            self.__running = True
+            self.__thread = threading.Thread(target=self.__run, name='live-recognition', daemon=True)
+            self.__thread.start()
+        return self
+
+    def __run(self):
+        last_frame_id = 0
+        last_finish = None
+
+        while self.__running:
+            frame_id, frame = self.__camera.latest()
+
+            # wait until enough new frames have arrived
+            if frame is None or frame_id - last_frame_id < self.__stride:
+                time.sleep(0.005)
+                continue
+
+            if last_frame_id:
+                self.__skipped += frame_id - last_frame_id - 1
+            last_frame_id = frame_id
+
+            try:
+                colours = self.__analyse(frame)
+            except Exception:
+                colours = None
+            finish = time.perf_counter()
+
+            # frames that arrived while analysing set how far behind the camera we are
+            frames_behind = self.__camera.frames_read() - frame_id
+            if frames_behind > self.__stride:
+                self.__stride = min(frames_behind, self.__max_stride)
+            elif frames_behind < self.__stride:
+                self.__stride = max(self.__stride - 1, self.__min_stride)
+
+            with self.__lock:
+                self.__vote.add(colours)
+                self.__analysed += 1
+
+                # smoothed rate of completed analyses
+                if last_finish is not None:
+                    fps = 1.0 / max(finish - last_finish, 1e-6)
+                    self.__analysis_fps = fps if self.__analysis_fps == 0 else 0.8 * self.__analysis_fps + 0.2 * fps
+            last_finish = finish
+
+    # voted band colours, or None while the readings disagree
+
+    def stable_colours(self):
+        with self.__lock:
+            return self.__vote.stable()
+
+    # getters
+    def analysis_fps(self):
+        with self.__lock:
+            return self.__analysis_fps
+
+    def frames_analysed(self):
+        return self.__analysed
+
+    def frames_skipped(self):
+        return self.__skipped
+
+    def stride(self):
+        return self.__stride
+
+    def running(self):
+        return self.__running
+
+    # stops the analysis thread and forgets the votes; waits for the analysis in progress to finish,
+    # since the analyse function's pipeline and buffers may be handed to the next LiveRecognition
+    # returns False when the thread is still analysing after timeout seconds
+
+    def stop(self, timeout=None):
+        self.__running = False
+        if self.__thread is not None:
+            self.__thread.join(timeout)
+            if self.__thread.is_alive():
+                return False
+            self.__thread = None
+        with self.__lock:
+            self.__vote.clear()
+        return True
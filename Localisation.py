@@ -0,0 +1,83 @@
+# import necessary libraries
+import numpy as np
+import cv2 as cv
+
+from config import THRESHOLD_VALUE, LOCALISATION_MAX_WIDTH, ROI_PADDING
+
+
+# locates the resistor on a downscaled copy of large frames, so only the region around it
+# has to be processed at full resolution
+
+
+# factor the frame is scaled by for localisation, 1.0 when it is no wider than max_width
+
+def localisation_scale(frame_shape, max_width=LOCALISATION_MAX_WIDTH):
+    return min(1.0, max_width / frame_shape[1])
+
+
+# threshold an image and find its contours, with the gray and threshold images taken from a BufferPool
+# when one is given
+
+def threshold_contours(image, pool=None):
+    shape = image.shape[:2]
+    gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY, dst=None if pool is None else pool.get('gray', shape))
+    _, threshold = cv.threshold(gray, THRESHOLD_VALUE, 255, cv.THRESH_BINARY_INV,
+                                dst=None if pool is None else pool.get('threshold', shape))
+    contours, _ = cv.findContours(threshold, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
+    return contours
+
+
+# copy of the frame scaled by the given factor, with the exact per-axis factors of its integer size
+# linear interpolation samples only a few pixels per output pixel, which is plenty for thresholding
+# a resistor-sized object, while area averaging would cost as much as the full frame processing it saves
+
+def downscale(frame, scale, pool=None):
+    height, width = frame.shape[:2]
+    size = (max(int(round(width * scale)), 1), max(int(round(height * scale)), 1))
+    dst = None if pool is None else pool.get('downscaled', (size[1], size[0]) + frame.shape[2:], frame.dtype)
+    small = cv.resize(frame, size, dst=dst, interpolation=cv.INTER_LINEAR)
+    return small, (size[0] / width, size[1] / height)
+
+
+# minimum area rectangle around the largest contour, or None when there are no contours
+
+def largest_rectangle(contours):
+    if len(contours) == 0:
+        return None
+    largest_contour_index = max(range(len(contours)), key=lambda i: cv.contourArea(contours[i]))
+    return cv.minAreaRect(contours[largest_contour_index])
+
+
+# maps a rectangle found on a scaled image back to the image it was scaled from
+# pixel centres line up, so the centre moves by half a pixel on either side of the scaling
+
+def unscale_rectangle(rectangle, factors):
+    (centre_x, centre_y), (width, height), angle = rectangle
+    factor_x, factor_y = factors
+    centre = ((centre_x + 0.5) / factor_x - 0.5, (centre_y + 0.5) / factor_y - 0.5)
+    return centre, (width / factor_x, height / factor_y), angle
+
+
+# moves a rectangle by an offset, e.g. into the coordinates of a region
+
+def shift_rectangle(rectangle, dx, dy):
+    (centre_x, centre_y), size, angle = rectangle
+    return (centre_x + dx, centre_y + dy), size, angle
+
+
+# square region (x, y, width, height) centred on the rectangle, large enough for the rectangle
+# at any rotation and never smaller than min_side, clipped to the frame
+
+def resistor_roi(rectangle, frame_shape, min_side=0, padding=ROI_PADDING):
+    (centre_x, centre_y), (width, height), _ = rectangle
+    frame_height, frame_width = frame_shape[:2]
+
+    side = int(np.ceil(max(np.hypot(width, height) * padding, min_side)))
+    side_x = min(side, frame_width)
+    side_y = min(side, frame_height)
+
+    x = int(round(centre_x - side_x / 2))
+    y = int(round(centre_y - side_y / 2))
+    x = min(max(x, 0), frame_width - side_x)
+    y = min(max(y, 0), frame_height - side_y)
+    return x, y, side_x, side_y
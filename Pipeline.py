@@ -0,0 +1,350 @@
+# import necessary libraries
+import time
+
+import numpy as np
+import cv2 as cv
+
+# import classes self-created
+from Preprocessing import RotateImage, CropImage, WhitebalanceImage, WhitebalanceGains
+from Bands import (
+    ColourClassifier, GoldBand, BrownBands, BlackBands, GreenBands, YellowBands,
+    BlueBands, OrangeBands, RedBands, VioletBands, WhiteBands
+)
+from Analysis import UniqueBands, SortBands, SortColours, ResistanceCalculation
+from Buffers import BufferPool
+from Cache import default_assets
+from Localisation import (
+    localisation_scale, threshold_contours, downscale, largest_rectangle, unscale_rectangle, shift_rectangle,
+    resistor_roi
+)
+from Tracing import span, enabled as tracing_enabled
+from config import MIN_CONTOUR_AREA, ROI_PADDING, BAND_SELECTION, REUSE_FRAME_BUFFERS
+
+
+# runs the recognition stages on one frame, computing each stage at most once
+
+class RecognitionPipeline:
+
+    # colour detectors in the order their bands are added to the combined image
+    band_detectors = (
+        ('gold', GoldBand),
+        ('brown', BrownBands),
+        ('green', GreenBands),
+        ('violet', VioletBands),
+        ('yellow', YellowBands),
+        ('red', RedBands),
+        ('black', BlackBands),
+        ('orange', OrangeBands),
+        ('blue', BlueBands),
+        ('white', WhiteBands),
+    )
+
+    # stage names in the order they run, as reported by timings()
+    stage_names = ('localisation', 'resistor_contours', 'bounding_rectangle', 'resistor_roi', 'rotated_image',
+                   'cropped_image', 'whitebalanced_image', 'band_contours', 'sorted_colours', 'resistance')
+
+    # initialise with the cache holding the template and reference images shared by every frame
+    # session_whitebalance carries the white balance estimate over from frame to frame (see
+    # WhitebalanceGains) instead of estimating it from each frame alone, and a ResistorTracker
+    # makes each frame search only around where the resistor was in the previous one
+    # with reuse_buffers, intermediate images are written into arrays kept from frame to frame, so the
+    # images a pipeline returns are only valid until the next frame is loaded
+
+    def __init__(self, assets=None, session_whitebalance=False, tracker=None, reuse_buffers=REUSE_FRAME_BUFFERS):
+        self.__assets = default_assets if assets is None else assets
+        self.__tracker = tracker
+        self.__buffers = BufferPool() if reuse_buffers else None
+        self.__session_whitebalance = session_whitebalance
+        self.__whitebalance_gains = None
+        self.__frame = None
+        self.__stages = {}
+        self.__timings = {}
+        self.__nested_time = 0.0
+
+    # replaces the frame and forgets every result computed from the previous one
+
+    def load_frame(self, frame):
+        if self.__buffers is not None and self.__frame is not None:
+            self.__buffers.next_frame()
+        self.__frame = frame
+        self.__stages = {}
+        self.__timings = {}
+
+    # getters
+    def frame(self):
+        return self.__frame
+
+    # BufferPool holding the intermediate images, None without reuse_buffers
+    def buffer_pool(self):
+        return self.__buffers
+
+    # seconds spent in each stage computed for the current frame, excluding the stages it requested
+
+    def timings(self):
+        return dict(self.__timings)
+
+    # computes a stage the first time it is requested for the current frame, then reuses it
+
+    def _stage(self, name, compute):
+        if name not in self.__stages:
+            outer_nested_time = self.__nested_time
+            self.__nested_time = 0.0
+            start = time.perf_counter()
+            try:
+                with span('pipeline.' + name, frame=self.__frame.shape) as stage_span:
+                    self.__stages[name] = compute()
+                    if tracing_enabled():
+                        stage_span.set(output=self.__size(self.__stages[name]))
+            finally:
+                elapsed = time.perf_counter() - start
+                self.__timings[name] = elapsed - self.__nested_time
+                self.__nested_time = outer_nested_time + elapsed
+        return self.__stages[name]
+
+    # shape of an image result or length of a list result, for trace attributes
+
+    @staticmethod
+    def __size(value):
+        if isinstance(value, np.ndarray):
+            return value.shape
+        if isinstance(value, (list, tuple)):
+            return len(value)
+        return None
+
+    # stage 1: threshold the frame and find its contours
+    # the frame is downscaled when wider than LOCALISATION_MAX_WIDTH, and with a tracker only the window
+    # around the previous resistor is searched, falling back to the whole frame if the result is doubtful
+    # gives the searched image, its scale factors and offset in the frame, its contours and whether the
+    # tracker's window was used
+
+    def localisation(self):
+        return self._stage('localisation', self.__localisation)
+
+    def __localisation(self):
+        if self.__tracker is not None:
+            window = self.__tracker.search_window(self.__frame.shape)
+            if window is not None:
+                localisation = self.__localise(window)
+                if self.__tracker.confident(self.__frame_rectangle(localisation), window, self.__frame.shape):
+                    return localisation
+                self.__tracker.lose()
+
+        return self.__localise(None)
+
+    def __localise(self, window):
+        if window is None:
+            region, offset = self.__frame, (0, 0)
+        else:
+            x, y, width, height = window
+            region, offset = self.__frame[y:y + height, x:x + width], (x, y)
+
+        scale = localisation_scale(region.shape)
+        if scale == 1.0:
+            image, factors = region, (1.0, 1.0)
+        else:
+            image, factors = downscale(region, scale, self.__buffers)
+
+        return image, factors, offset, threshold_contours(image, self.__buffers), window is not None
+
+    # rectangle around the largest contour of a localisation, in full frame coordinates
+
+    @staticmethod
+    def __frame_rectangle(localisation):
+        _, factors, offset, contours, _ = localisation
+        rectangle = largest_rectangle(contours)
+        if rectangle is None:
+            return None
+        if factors != (1.0, 1.0):
+            rectangle = unscale_rectangle(rectangle, factors)
+        if offset != (0, 0):
+            rectangle = shift_rectangle(rectangle, *offset)
+        return rectangle
+
+    # getters for the parts of the localisation
+    def localisation_image(self):
+        return self.localisation()[0]
+
+    def localisation_factors(self):
+        return self.localisation()[1]
+
+    def threshold_contours(self):
+        return self.localisation()[3]
+
+    def localisation_tracked(self):
+        return self.localisation()[4]
+
+    # contours large enough to be part of a resistor
+
+    def resistor_contours(self):
+        return self._stage('resistor_contours', self.__resistor_contours)
+
+    def __resistor_contours(self):
+        factor_x, factor_y = self.localisation_factors()
+        min_area = MIN_CONTOUR_AREA * factor_x * factor_y
+        return [contour for contour in self.threshold_contours() if cv.contourArea(contour) > min_area]
+
+    def resistor_detected(self):
+        return len(self.resistor_contours()) > 0
+
+    # rectangle around the largest contour in full resolution coordinates, None without contours
+
+    def bounding_rectangle(self):
+        return self._stage('bounding_rectangle', lambda: self.__frame_rectangle(self.localisation()))
+
+    # region of the full frame processed from here on, None when the whole frame is used
+
+    def resistor_roi(self):
+        return self._stage('resistor_roi', self.__resistor_roi)
+
+    def __resistor_roi(self):
+        rectangle = self.bounding_rectangle()
+        if rectangle is None or (self.localisation_factors() == (1.0, 1.0) and self.__tracker is None):
+            return None
+
+        # the template has to fit inside the region after rotation
+        min_side = max(self.__assets.template().shape) * ROI_PADDING
+        return resistor_roi(rectangle, self.__frame.shape, min_side)
+
+    # stage 2: rotate the frame (or the region around the resistor) so the resistor lies horizontally
+
+    def rotated_image(self):
+        return self._stage('rotated_image', self.__rotated_image)
+
+    def __rotated_image(self):
+        roi = self.resistor_roi()
+        if roi is None:
+            img_to_rotate = RotateImage(self.__frame)
+            img_to_rotate._set_bounding_rectangle(self.threshold_contours())
+        else:
+            x, y, width, height = roi
+            img_to_rotate = RotateImage(self.__frame[y:y + height, x:x + width])
+            img_to_rotate._set_known_bounding_rectangle(shift_rectangle(self.bounding_rectangle(), -x, -y))
+
+        img_to_rotate._set_rotation_angle()
+        img_to_rotate._set_rotation_matrix()
+        return img_to_rotate._get_rotated_image()
+
+    # stage 3: crop the resistor out of the rotated frame
+
+    def cropped_image(self):
+        return self._stage('cropped_image', self.__cropped_image)
+
+    def __cropped_image(self):
+        rotated_image = self.rotated_image()
+        template = self.__assets.template()
+        if self.__tracker is None:
+            return CropImage(rotated_image, template).get_cropped_image()
+
+        # a tracked frame only searches around the previous crop, unless that match is much weaker
+        hint = self.__tracker.crop_hint() if self.localisation_tracked() else None
+        crop = CropImage(rotated_image, template, hint=hint)
+        if hint is not None and not self.__tracker.crop_confident(crop.match_score()):
+            crop = CropImage(rotated_image, template)
+
+        self.__tracker.update(self.bounding_rectangle(), crop.locate(), crop.match_score(),
+                              self.localisation_tracked())
+        return crop.get_cropped_image()
+
+    # stage 4: white balance the cropped resistor
+
+    def whitebalanced_image(self):
+        return self._stage('whitebalanced_image', self.__whitebalanced_image)
+
+    def __whitebalanced_image(self):
+        reference = self.__assets.whitebalance_reference()
+        if not self.__session_whitebalance:
+            return WhitebalanceImage(self.cropped_image(), reference).final_whitebalanced()
+
+        # a reference reloaded from disk invalidates the estimate
+        if self.__whitebalance_gains is None or self.__whitebalance_gains.reference() is not reference:
+            self.__whitebalance_gains = WhitebalanceGains(reference)
+        return self.__whitebalance_gains.whitebalance(self.cropped_image())
+
+    # session white balance estimate, None until a frame has been white balanced with one
+
+    def whitebalance_gains(self):
+        return self.__whitebalance_gains
+
+    # stage 5: find the contours of every colour band and the image combining them
+
+    def band_contours(self):
+        return self._stage('band_contours', self.__band_contours)
+
+    def __band_contours(self):
+        resistor_img = self.whitebalanced_image()
+        if self.__buffers is None:
+            combined_image = np.zeros_like(resistor_img)
+        else:
+            combined_image = self.__buffers.zeros('combined_image', resistor_img.shape, resistor_img.dtype)
+        colour_contours = {}
+
+        # one HSV conversion shared by every detector
+        classifier = ColourClassifier(resistor_img, self.__buffers)
+        with span('bands.classifier', shape=resistor_img.shape):
+            classifier.labels()
+
+        # each detector adds its bands to the previous combined image
+        for colour, detector in self.band_detectors:
+            with span('bands.' + colour, shape=resistor_img.shape) as detector_span:
+                colour_contours[colour], combined_image = detector(resistor_img, combined_image, classifier,
+                                                                   self.__buffers).colour_band_image()
+                detector_span.set(contours=len(colour_contours[colour]))
+
+        return colour_contours, combined_image
+
+    def combined_image(self):
+        return self.band_contours()[1]
+
+    # stage 6: order the unique bands and name their colours
+
+    def sorted_colours(self):
+        return [colour for colour, _ in self.scored_colours()]
+
+    # confidence of each colour in sorted_colours, from 1 for a perfect shape match down to 0
+
+    def colour_confidences(self):
+        return [confidence for _, confidence in self.scored_colours()]
+
+    def scored_colours(self):
+        return self._stage('sorted_colours', self.__sorted_colours)
+
+    def __sorted_colours(self):
+        colour_contours, combined_image = self.band_contours()
+
+        # finds contours of combined image using thresholding
+        shape = combined_image.shape[:2]
+        pool = self.__buffers
+        gray_combined = cv.cvtColor(combined_image, cv.COLOR_BGR2GRAY,
+                                    dst=None if pool is None else pool.get('combined_gray', shape))
+        _, combined_threshold = cv.threshold(gray_combined, 1, 255, cv.THRESH_BINARY,
+                                             dst=None if pool is None else pool.get('combined_threshold', shape))
+        contours, _ = cv.findContours(combined_threshold, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+
+        # ensure individual bands are not repeated, then sort them by x values
+        with span('analysis.unique_bands', contours=len(contours)):
+            selected_contours = UniqueBands(contours, keep=BAND_SELECTION).find_unique_bands()
+        with span('analysis.sort_bands', contours=len(selected_contours)):
+            sorted_contours = SortBands(selected_contours).sort_contours()
+
+        colour_sort = SortColours(sorted_contours, colour_contours['orange'], colour_contours['red'],
+                                  colour_contours['green'], colour_contours['blue'], colour_contours['yellow'],
+                                  colour_contours['black'], colour_contours['brown'], colour_contours['gold'],
+                                  colour_contours['white'], colour_contours['violet'])
+        with span('analysis.sort_colours', contours=len(sorted_contours)):
+            sorted_contours_colours = colour_sort.scored_assignment()
+
+        # ensures gold band is always at the right end
+        if sorted_contours_colours and sorted_contours_colours[0][0] == 'gold':
+            sorted_contours_colours.reverse()
+
+        return sorted_contours_colours
+
+    # stage 7: decode the band colours into a resistance
+
+    def resistance(self):
+        return self._stage('resistance', self.__resistance)
+
+    def __resistance(self):
+        colours = self.sorted_colours()
+        resistance = ResistanceCalculation(*colours)
+        return resistance.findResistance()
@@ -1,22 +1,47 @@
 # import libraries
+import threading
+
 import numpy as np
 import cv2 as cv
 
+from config import (
+    CROP_MATCH_MODE, CROP_PYRAMID_LEVELS, CROP_REFINE_RADIUS, CROP_HINT_RADIUS,
+    WHITEBALANCE_GAIN_SMOOTHING, WHITEBALANCE_DRIFT_THRESHOLD
+)
+
 
 # perform white balancing on the image
 class WhitebalanceImage:
 
     # initialise with attributes of image and the reference images
+    # the reference may be a prepared WhitebalanceReference so it is not resized again
 
     def __init__(self, image_to_whitebalance, reference_image):
         self.__img = cv.resize(image_to_whitebalance, (450, 350))
-        self.__reference_image = cv.resize(reference_image, (450, 350))
+        if not isinstance(reference_image, WhitebalanceReference):
+            reference_image = WhitebalanceReference(reference_image)
+        self.__reference = reference_image
 
     # extract a patch of the white background common in both images
+    # the patch is taken from the image upsampled 20 times, but only the few source pixels
+    # feeding it are upsampled, so the full 9000x7000 image is never built
+
+    @staticmethod
+    def extract_white_patch(image):
+        row_start, row_stop = WhitebalanceImage.__source_span(60, 75, image.shape[0])
+        col_start, col_stop = WhitebalanceImage.__source_span(300, 315, image.shape[1])
+
+        result_patch = cv.resize(image[row_start:row_stop, col_start:col_stop], None, fx=20, fy=20)
+        return result_patch[60 - 20 * row_start: 75 - 20 * row_start, 300 - 20 * col_start: 315 - 20 * col_start]
 
-    def extract_white_patch(self, image):
-        result_patch = cv.resize(image, None, fx=20, fy=20)
-        return result_patch[60: 75, 300: 315]
+    # source pixels sampled by linear interpolation for upsampled pixels start to stop,
+    # with one pixel either side so the patch never sits on the border of the region
+
+    @staticmethod
+    def __source_span(start, stop, size):
+        first = int(np.floor((start + 0.5) / 20 - 0.5)) - 1
+        last = int(np.floor((stop - 0.5) / 20 - 0.5)) + 2
+        return max(first, 0), min(last + 1, size)
 
     # perform ground truth whitebalancing using a patch on the image
 
@@ -32,17 +57,14 @@ class WhitebalanceImage:
         # convert BGR to RGB
         ground_truth_whitebalanced_img = max_value_whitebalancing[:, :, ::-1]
 
-        cv.waitKey(0)
-        cv.destroyAllWindows()
-
         return ground_truth_whitebalanced_img
 
     # different type of whitebalancing using Euclidian distance
     def deviation_whitebalancing(self):
-        reference_patch = self.extract_white_patch(self.__reference_image)
+        reference_patch = self.__reference.patch
         current_patch = self.extract_white_patch(self.__img)
 
-        reference_patch_mean = np.mean(reference_patch)
+        reference_patch_mean = self.__reference.patch_mean
         current_patch_mean = np.mean(current_patch)
 
         # finds the Euclidian distance between patches
@@ -76,33 +98,253 @@ class WhitebalanceImage:
         return final_whitebalanced_img
 
 
+# reference image prepared for white balancing: resized once, with its white patch and patch mean
+
+class WhitebalanceReference:
+
+    def __init__(self, reference_image):
+        self.image = cv.resize(reference_image, (450, 350))
+        self.patch = WhitebalanceImage.extract_white_patch(self.image)
+        self.patch_mean = np.mean(self.patch)
+
+
+# white balance corrections estimated once per session and then followed from frame to frame
+# the per-frame statistics final_whitebalanced derives from the white patch (its mean, its distance to
+# the reference patch and its per-channel maxima) are smoothed with an exponential moving average,
+# and the correction is applied through lookup tables, which match final_whitebalanced exactly
+# whenever the smoothed statistics equal the frame's own
+
+class WhitebalanceGains:
+
+    # initialise with the reference; smoothing is the weight of each new frame, and a frame whose
+    # patch mean or maxima move further than drift_threshold (relative) from the estimate starts over
+
+    def __init__(self, reference_image, smoothing=WHITEBALANCE_GAIN_SMOOTHING,
+                 drift_threshold=WHITEBALANCE_DRIFT_THRESHOLD):
+        if not isinstance(reference_image, WhitebalanceReference):
+            reference_image = WhitebalanceReference(reference_image)
+        self.__reference = reference_image
+        self.__smoothing = smoothing
+        self.__drift_threshold = drift_threshold
+        self.__lock = threading.Lock()
+        self.reset()
+
+    # forget the estimate so the next frame is measured from scratch
+
+    def reset(self):
+        self.__patch_mean = None
+        self.__deviation = None
+        self.__patch_max = None
+        self.__updates = 0
+        self.__estimations = 0
+
+    # white patch statistics of a 450x350 image, computed as final_whitebalanced computes them
+
+    def __measure(self, image):
+        current_patch = WhitebalanceImage.extract_white_patch(image)
+        return (np.mean(current_patch), np.linalg.norm(self.__reference.patch - current_patch),
+                current_patch.max(axis=(0, 1)).astype(np.float64))
+
+    # folds one frame into the estimate, starting over on the first frame or when lighting drifted
+
+    def update(self, image):
+        patch_mean, deviation, patch_max = self.__measure(image)
+
+        with self.__lock:
+            drifted = self.__patch_mean is None
+            if not drifted:
+                mean_drift = abs(patch_mean - self.__patch_mean) / max(self.__patch_mean, 1.0)
+                max_drift = np.max(np.abs(patch_max - self.__patch_max) / np.maximum(self.__patch_max, 1.0))
+                drifted = max(mean_drift, max_drift) > self.__drift_threshold
+
+            if drifted:
+                self.__patch_mean, self.__deviation, self.__patch_max = patch_mean, deviation, patch_max
+                self.__estimations += 1
+            else:
+                weight = self.__smoothing
+                self.__patch_mean += weight * (patch_mean - self.__patch_mean)
+                self.__deviation += weight * (deviation - self.__deviation)
+                self.__patch_max = self.__patch_max + weight * (patch_max - self.__patch_max)
+            self.__updates += 1
+
+    # lookup tables for the deviation correction (shared by all channels) and the ground truth
+    # correction (one column per channel), both built from the current estimate
+
+    def tables(self):
+        with self.__lock:
+            if self.__patch_mean is None:
+                raise ValueError("No frame has been used to estimate the white balance yet")
+            scale1 = self.__reference.patch_mean / self.__patch_mean
+            scale2 = 0.03 * self.__deviation
+            patch_max = self.__patch_max
+
+        values = np.arange(256, dtype=np.uint8)
+        deviation_table = np.clip(values * scale1 * 0.6 + (values + scale2) * 0.4, 0, 255).astype(np.uint8)
+        ground_truth_table = ((values[:, None] * 1.0 / patch_max).clip(0, 1) * 255).astype(np.uint8)
+        return deviation_table, ground_truth_table.reshape(1, 256, 3)
+
+    # white balances a 450x350 image with the current estimate
+
+    def apply(self, image):
+        deviation_table, ground_truth_table = self.tables()
+        whitebalance1 = cv.LUT(image, deviation_table)
+
+        # the ground truth correction swaps the image to RGB before the two are blended
+        whitebalance2 = np.ascontiguousarray(cv.LUT(image, ground_truth_table)[:, :, ::-1])
+
+        return cv.addWeighted(whitebalance1, 0.3, whitebalance2, 0.7, 0)
+
+    # resizes, updates the estimate and applies it, in place of WhitebalanceImage.final_whitebalanced
+
+    def whitebalance(self, image_to_whitebalance):
+        image = cv.resize(image_to_whitebalance, (450, 350))
+        self.update(image)
+        return self.apply(image)
+
+    # getters
+    def reference(self):
+        return self.__reference
+
+    def updates(self):
+        return self.__updates
+
+    def estimations(self):
+        return self.__estimations
+
+
 # crops captured frame
 
 class CropImage:
 
-    def __init__(self, img_to_crop, template_img):
+    # template pyramids shared between instances, keyed by the template object and level count
+    # the capture and live threads crop at the same time, so the cache is only touched under its lock
+    __pyramid_cache = {}
+    __pyramid_lock = threading.Lock()
+    pyramid_cache_size = 4
+
+    # mode 'exhaustive' matches the full resolution template everywhere in the frame, 'pyramid' matches
+    # a downsampled template against a downsampled frame and then searches only around that location
+    # hint is a top left corner expected from a previous frame; only hint_radius pixels around it are searched
+
+    def __init__(self, img_to_crop, template_img, mode=CROP_MATCH_MODE, pyramid_levels=CROP_PYRAMID_LEVELS,
+                 refine_radius=CROP_REFINE_RADIUS, hint=None, hint_radius=CROP_HINT_RADIUS):
         # adds attributes of image and template
 
         self.__img = img_to_crop
         self.__template = template_img
+        self.__mode = mode
+        self.__pyramid_levels = pyramid_levels
+        self.__refine_radius = refine_radius
+        self.__hint = hint
+        self.__hint_radius = hint_radius
+        self.__location = None
+        self.__score = None
 
-    # uses template matching to crop
+    # top left corner of the best template match in the frame, found on first use
 
-    def get_cropped_image(self):
-        template_width, template_height = self.__template.shape[::-1]
+    def locate(self):
+        if self.__location is None:
+            self.__location, self.__score = self.__search()
+        return self.__location
+
+    # TM_CCOEFF score of the match, comparable between frames of the same scene
+
+    def match_score(self):
+        self.locate()
+        return self.__score
+
+    def __search(self):
         img_gray = cv.cvtColor(self.__img, cv.COLOR_BGR2GRAY)
 
-        # detects the location of the resistor
+        if self.__mode not in ('pyramid', 'exhaustive'):
+            raise ValueError(f"Unknown template matching mode: {self.__mode}")
 
-        method = eval('cv.TM_CCOEFF')
-        resistor_detection = cv.matchTemplate(img_gray, self.__template, method)
+        if self.__hint is not None:
+            return self.__window_match(img_gray, self.__hint, self.__hint_radius)
 
-        # finds max and min locations where there is a match to crop
+        if self.__mode == 'pyramid' and self.__pyramid_levels > 0:
+            match = self.__pyramid_match(img_gray)
+            if match is not None:
+                return match
 
+        return self.__best_match(img_gray, self.__template)
+
+    # finds max location where there is a match, and its score
+
+    @staticmethod
+    def __best_match(img_gray, template):
+        resistor_detection = cv.matchTemplate(img_gray, template, cv.TM_CCOEFF)
         min_val, max_val, min_loc, max_loc = cv.minMaxLoc(resistor_detection)
-        top_left = max_loc
-        bottom_right = (top_left[0] + template_width, top_left[1] + template_height)
+        return max_loc, max_val
+
+    # best match among the top left corners within radius of a location
+
+    def __window_match(self, img_gray, location, radius):
+        template_height, template_width = self.__template.shape
+        max_x = img_gray.shape[1] - template_width
+        max_y = img_gray.shape[0] - template_height
+        left = min(max(location[0] - radius, 0), max_x)
+        top = min(max(location[1] - radius, 0), max_y)
+        right = min(max(location[0] + radius, left), max_x)
+        bottom = min(max(location[1] + radius, top), max_y)
+
+        window = img_gray[top:bottom + template_height, left:right + template_width]
+        (window_x, window_y), score = self.__best_match(window, self.__template)
+        return (left + window_x, top + window_y), score
+
+    # coarse match on the smallest pyramid level, refined at full resolution in a small window
+    # returns None when the frame is too small to downsample that far
+
+    def __pyramid_match(self, img_gray):
+        levels = self.__pyramid_levels
+        template_pyramid = self.__template_pyramid(self.__template, levels)
+        coarse_template = template_pyramid[-1]
+
+        coarse_img = img_gray
+        for _ in range(levels):
+            coarse_img = cv.pyrDown(coarse_img)
+        if coarse_img.shape[0] < coarse_template.shape[0] or coarse_img.shape[1] < coarse_template.shape[1]:
+            return None
+
+        (coarse_x, coarse_y), _ = self.__best_match(coarse_img, coarse_template)
+
+        # the window covers every full resolution position that rounds to the coarse match
+        scale = 2 ** levels
+        return self.__window_match(img_gray, (coarse_x * scale, coarse_y * scale), self.__refine_radius)
+
+    # template followed by each downsampled level, built once per template
+
+    @classmethod
+    def __template_pyramid(cls, template, levels):
+        key = (id(template), levels)
+        with cls.__pyramid_lock:
+            entry = cls.__pyramid_cache.get(key)
+
+        # the cache keeps the template alive, so a matching id always means the same array
+        if entry is None or entry[0] is not template:
+            pyramid = [template]
+            for _ in range(levels):
+                pyramid.append(cv.pyrDown(pyramid[-1]))
+            entry = (template, pyramid)
+
+            # keep the cache bounded, dropping the oldest pyramid first
+            with cls.__pyramid_lock:
+                cls.__pyramid_cache.pop(key, None)
+                if len(cls.__pyramid_cache) >= cls.pyramid_cache_size:
+                    del cls.__pyramid_cache[next(iter(cls.__pyramid_cache))]
+                cls.__pyramid_cache[key] = entry
+
+        return entry[1]
 
+    # uses template matching to crop
+
+    def get_cropped_image(self):
+        template_width, template_height = self.__template.shape[::-1]
+
+        # detects the location of the resistor
+
+        top_left = self.locate()
+        bottom_right = (top_left[0] + template_width, top_left[1] + template_height)
 
         cropped_region = self.__img[top_left[1]:bottom_right[1], top_left[0]:bottom_right[0]]
 
@@ -119,10 +361,19 @@ class CropImage:
 
 class RotateImage:
 
+    # remap tables shared between instances, keyed by frame size and quantised angle
+    # the capture and live threads rotate at the same time, so the cache is only touched under its lock
+    __remap_cache = {}
+    __remap_lock = threading.Lock()
+    remap_cache_size = 32
+    angle_quantisation = 0.1
+
     # initialise object with necessary attributes
+    # forward_mapping keeps the original pixel-pushing rotation for compatibility
 
-    def __init__(self, img):
+    def __init__(self, img, forward_mapping=False):
         self.__img = img
+        self.__forward_mapping = forward_mapping
         self.__bounding_rectangle = None
         self.__rotation_angle = None
         self.__rotation_matrix = None
@@ -142,6 +393,10 @@ class RotateImage:
             bounding_rectangle = cv.minAreaRect(frame_contours[largest_contour_index])
             self.__bounding_rectangle = bounding_rectangle
 
+    # setter for a rectangle already found elsewhere, e.g. on a downscaled copy of the frame
+    def _set_known_bounding_rectangle(self, bounding_rectangle):
+        self.__bounding_rectangle = bounding_rectangle
+
     # getter
     def _get_bounding_rectangle(self):
         return self.__bounding_rectangle
@@ -219,19 +474,82 @@ class RotateImage:
 
     def _get_rotated_image(self):
 
-        #  rotated_image = cv.warpAffine(self.__img, self._get_rotation_matrix(), (self.width, self.height))
-        rotated_image = np.zeros_like(self.__img)
-
-        # nested for loop to apply matrix and rotate every pixel
-        for y in range(self.__img.shape[0]):
-            for x in range(self.__img.shape[1]):
-                new_x, new_y = np.dot(self.__rotation_matrix, [x, y, 1])
-                new_x, new_y = int(new_x), int(new_y)
-                if 0 <= new_x < self.__img.shape[1] and 0 <= new_y < self.__img.shape[0]:
+        # a zero angle leaves every pixel where it is, so skip the warp entirely
+        if self._get_rotation_angle() == 0:
+            self.__rotated_image = self.__img.copy()
 
-                    # assign pixel value of original to new position
-                    rotated_image[new_y, new_x] = self.__img[y, x]
+        elif self.__forward_mapping:
+            self.__rotated_image = self.__forward_rotated_image()
 
-        self.__rotated_image = rotated_image
+        else:
+            self.__rotated_image = self.__inverse_rotated_image()
 
         return self.__rotated_image
+
+    # applies the matrix to every pixel at once, matching the original per-pixel loop exactly
+
+    def __forward_rotated_image(self):
+        rotated_image = np.zeros_like(self.__img)
+
+        # coordinates of every source pixel in row-major order, as the loop visited them
+        y, x = np.indices((self.__height, self.__width))
+        new_x = self.__transform_row(self.__rotation_matrix[0], x, y)
+        new_y = self.__transform_row(self.__rotation_matrix[1], x, y)
+
+        # int() truncates towards zero, so do the same before bounds checking
+        new_x = np.trunc(new_x).astype(np.intp)
+        new_y = np.trunc(new_y).astype(np.intp)
+        inside = (0 <= new_x) & (new_x < self.__width) & (0 <= new_y) & (new_y < self.__height)
+
+        # later pixels overwrite earlier ones landing on the same position, as in the loop
+        rotated_image[new_y[inside], new_x[inside]] = self.__img[y[inside], x[inside]]
+
+        return rotated_image
+
+    # one row of the matrix product, rounded the way np.dot rounds it for a single [x, y, 1] vector
+    # (the x term is fused with the y term before the offset is added)
+
+    @staticmethod
+    def __transform_row(row, x, y):
+        y_term = (row[1] * y).astype(np.longdouble)
+        return (row[0].astype(np.longdouble) * x + y_term).astype(np.float64) + row[2]
+
+    # looks up the source pixel of every destination pixel using a cached remap table
+
+    def __inverse_rotated_image(self):
+        map_x, map_y = self.__remap_table()
+        return cv.remap(self.__img, map_x, map_y, cv.INTER_NEAREST, borderMode=cv.BORDER_CONSTANT, borderValue=0)
+
+    # builds (or reuses) the inverse map for this frame size and quantised angle
+
+    def __remap_table(self):
+        step = RotateImage.angle_quantisation
+        quantised_angle = round(self._get_rotation_angle() / step) * step
+        key = (self.__width, self.__height, quantised_angle)
+
+        with RotateImage.__remap_lock:
+            remap_table = RotateImage.__remap_cache.get(key)
+        if remap_table is None:
+            center = ((self.__width - 1) // 2, (self.__height - 1) // 2)
+            angle_rad = quantised_angle * np.pi / 180.0
+            alpha = np.cos(angle_rad)
+            beta = np.sin(angle_rad)
+
+            # the inverse of a rotation about the centre is the rotation by the opposite angle
+            y, x = np.indices((self.__height, self.__width), dtype=np.float32)
+            x -= center[0]
+            y -= center[1]
+            map_x = (alpha * x - beta * y + center[0]).astype(np.float32)
+            map_y = (beta * x + alpha * y + center[1]).astype(np.float32)
+            remap_table = cv.convertMaps(map_x, map_y, cv.CV_16SC2, nninterpolation=True)
+
+            # keep the cache bounded, dropping the oldest table first; a table another thread stored for
+            # the same key meanwhile is used instead, as the two are identical
+            with RotateImage.__remap_lock:
+                if key not in RotateImage.__remap_cache:
+                    if len(RotateImage.__remap_cache) >= RotateImage.remap_cache_size:
+                        del RotateImage.__remap_cache[next(iter(RotateImage.__remap_cache))]
+                    RotateImage.__remap_cache[key] = remap_table
+                remap_table = RotateImage.__remap_cache[key]
+
+        return remap_table
@@ -0,0 +1,90 @@
+# import necessary libraries
+import time
+
+import numpy as np
+import cv2 as cv
+from PIL import Image, ImageTk
+
+
+# draws camera frames into one PhotoImage that is updated in place
+# each frame is shrunk to fit the preview and converted into buffers allocated once, which a PIL
+# image shares, so a frame costs a resize, a colour conversion and a paste into Tk
+
+class PreviewRenderer:
+
+    # initialise with the size of the area the preview is shown in
+
+    def __init__(self, width, height):
+        self.__width = width
+        self.__height = height
+        self.__frame_shape = None
+        self.__resized = None
+        self.__rgba = None
+        self.__image = None
+        self.__photo = None
+        self.__frames = 0
+        self.__last_render = None
+        self.__fps = 0.0
+        self.__render_time = 0.0
+
+    # size the frame is drawn at: shrunk to fit the preview keeping its aspect ratio, but never enlarged
+    # since the label centres a smaller frame and upscaling costs more than the rest of the frame
+
+    def __fitted_size(self, frame_shape):
+        frame_height, frame_width = frame_shape[:2]
+        scale = min(self.__width / frame_width, self.__height / frame_height, 1.0)
+        return max(int(round(frame_width * scale)), 1), max(int(round(frame_height * scale)), 1)
+
+    # (re)allocates the buffers for frames of a new shape; the PIL image reads the RGBA buffer directly
+
+    def __allocate(self, frame_shape):
+        width, height = self.__fitted_size(frame_shape)
+        self.__frame_shape = frame_shape
+        self.__resized = np.empty((height, width, 3), dtype=np.uint8)
+        self.__rgba = np.empty((height, width, 4), dtype=np.uint8)
+        self.__image = Image.frombuffer('RGBA', (width, height), self.__rgba, 'raw', 'RGBA', 0, 1)
+        self.__photo = ImageTk.PhotoImage(self.__image)
+
+    # draws a BGR frame; returns True when the PhotoImage was replaced (the first frame, or a new frame
+    # size) and has to be given to the label again, False when it was updated in place
+
+    def render(self, frame):
+        start = time.perf_counter()
+
+        replaced = frame.shape != self.__frame_shape
+        if replaced:
+            self.__allocate(frame.shape)
+
+        height, width = self.__resized.shape[:2]
+        if frame.shape[:2] == (height, width):
+            cv.cvtColor(frame, cv.COLOR_BGR2RGBA, dst=self.__rgba)
+        else:
+            cv.resize(frame, (width, height), dst=self.__resized, interpolation=cv.INTER_LINEAR)
+            cv.cvtColor(self.__resized, cv.COLOR_BGR2RGBA, dst=self.__rgba)
+        self.__photo.paste(self.__image)
+
+        # smoothed like the live analysis rate
+        finish = time.perf_counter()
+        render_time = finish - start
+        self.__render_time = render_time if self.__frames == 0 else 0.8 * self.__render_time + 0.2 * render_time
+        if self.__last_render is not None:
+            fps = 1.0 / max(finish - self.__last_render, 1e-6)
+            self.__fps = fps if self.__fps == 0 else 0.8 * self.__fps + 0.2 * fps
+        self.__last_render = finish
+        self.__frames += 1
+        return replaced
+
+    # getters
+    def photo(self):
+        return self.__photo
+
+    def frames_rendered(self):
+        return self.__frames
+
+    # frames drawn per second
+    def fps(self):
+        return self.__fps
+
+    # seconds spent drawing one frame
+    def render_time(self):
+        return self.__render_time
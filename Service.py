@@ -0,0 +1,424 @@
+# import necessary libraries
+import argparse
+import asyncio
+import io
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qsl
+
+import numpy as np
+import cv2 as cv
+
+# import classes self-created
+from Batch import _init_worker, empty_record, recognise_frame
+from Decoder import decode
+from config import (
+    SERVICE_PORT, SERVICE_BATCH_WINDOW, SERVICE_MAX_BATCH, SERVICE_QUEUE_SIZE, SERVICE_MAX_UPLOAD,
+    SERVICE_LATENCY_WINDOW
+)
+
+
+# recognition over HTTP on the loopback interface, for bench tools that are not the Tk window
+#   POST /recognise   an encoded image (any format cv.imdecode reads), a .npy array
+#                     (Content-Type: application/x-npy), or raw BGR bytes
+#                     (Content-Type: application/octet-stream, ?width=W&height=H[&channels=C])
+#   GET  /health      queue length, batch counts and latency percentiles
+# requests arriving close together are handed to a pool worker as one batch; once queue_size requests
+# are waiting, new ones are refused with 503 until the workers catch up
+
+HOST = '127.0.0.1'
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           411: 'Length Required', 413: 'Payload Too Large', 431: 'Request Header Fields Too Large',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+# turns an upload into a BGR frame, raising ValueError for anything that is not an 8 bit image
+
+def decode_upload(content_type, query, body):
+    media_type = content_type.split(';')[0].strip().lower()
+    if not body:
+        raise ValueError("empty upload")
+
+    if media_type == 'application/x-npy':
+        # truncated files raise EOFError and .npz archives load as an NpzFile rather than an array
+        try:
+            frame = np.load(io.BytesIO(body), allow_pickle=False)
+        except (OSError, EOFError, ValueError) as error:
+            raise ValueError(f"could not load .npy upload: {error}")
+        if not isinstance(frame, np.ndarray):
+            raise ValueError("expected a single .npy array")
+    elif media_type == 'application/octet-stream' and 'width' in query:
+        try:
+            width, height = int(query['width']), int(query['height'])
+            channels = int(query.get('channels', 3))
+        except (KeyError, ValueError):
+            raise ValueError("raw uploads need integer width, height and channels")
+        if len(body) != width * height * channels:
+            raise ValueError(f"expected {width * height * channels} bytes for a {width}x{height}x{channels} "
+                             f"image, got {len(body)}")
+        frame = np.frombuffer(body, dtype=np.uint8).reshape(height, width, channels).copy()
+    else:
+        frame = cv.imdecode(np.frombuffer(body, dtype=np.uint8), cv.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("could not decode image")
+
+    if frame.dtype != np.uint8 or frame.ndim not in (2, 3) or min(frame.shape[:2]) == 0:
+        raise ValueError(f"expected an 8 bit image, got {frame.dtype} array of shape {frame.shape}")
+    if frame.ndim == 2 or frame.shape[2] == 1:
+        return cv.cvtColor(frame, cv.COLOR_GRAY2BGR)
+    if frame.shape[2] == 4:
+        return cv.cvtColor(frame, cv.COLOR_BGRA2BGR)
+    if frame.shape[2] != 3:
+        raise ValueError(f"expected 1, 3 or 4 channels, got {frame.shape[2]}")
+    return frame
+
+
+# runs in a pool worker: recognises a batch of uploads, giving one record each with its HTTP status
+# an upload that cannot be decoded gets 400 and one that fails recognition 500, without touching the
+# other requests of its batch
+
+def recognise_uploads(uploads):
+    records = []
+    for content_type, query, body in uploads:
+        try:
+            frame = decode_upload(content_type, query, body)
+        except Exception as error:
+            record = empty_record()
+            record['error'] = f"{type(error).__name__}: {error}"
+            records.append((400, record))
+            continue
+
+        try:
+            record = recognise_frame(frame)
+        except Exception as error:
+            record = empty_record()
+            record['error'] = f"{type(error).__name__}: {error}"
+            records.append((500, record))
+            continue
+
+        record['ohms'] = record['tolerance'] = record['tempco'] = None
+        if record['resistance'] is not None:
+            value = decode(record['colours'])
+            for field in ('ohms', 'tolerance', 'tempco'):
+                record[field] = None if np.isnan(value[field]) else float(value[field])
+        records.append((200, record))
+    return records
+
+
+# pool workers leave SIGINT to the server, which shuts them down through close()
+
+def _init_service_worker():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _init_worker()
+
+
+# refused because the queue is full
+
+class ServiceBusy(Exception):
+    pass
+
+
+# request that could not be read, answered with its status
+
+class BadRequest(Exception):
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class RecognitionService:
+
+    # initialise with the port (0 picks a free one), the number of pool worker processes (default: one
+    # per CPU), how long a batch waits for more requests, its largest size and the queue depth
+
+    def __init__(self, port=SERVICE_PORT, processes=None, batch_window=SERVICE_BATCH_WINDOW,
+                 max_batch=SERVICE_MAX_BATCH, queue_size=SERVICE_QUEUE_SIZE, max_upload=SERVICE_MAX_UPLOAD,
+                 latency_window=SERVICE_LATENCY_WINDOW):
+        self.__port = port
+        self.__processes = processes
+        self.__batch_window = batch_window
+        self.__max_batch = max_batch
+        self.__queue_size = queue_size
+        self.__max_upload = max_upload
+        self.__latencies = deque(maxlen=latency_window)
+        self.__executor = None
+        self.__workers = 0
+        self.__server = None
+        self.__queue = None
+        self.__slots = None
+        self.__batcher = None
+        self.__batches = set()
+        self.__gathering = 0
+        self.__in_flight = 0
+        self.__requests = 0
+        self.__rejected = 0
+        self.__batch_count = 0
+        self.__batched_requests = 0
+        self.__started = None
+
+    # opens the worker pool and starts listening; returns the port actually bound
+
+    async def start(self):
+        workers = self.__processes or os.cpu_count() or 1
+        self.__executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_service_worker)
+        self.__workers = workers
+
+        # one batch per worker in flight, the rest wait in the bounded queue
+        self.__queue = asyncio.Queue(maxsize=self.__queue_size)
+        self.__slots = asyncio.Semaphore(workers)
+        self.__batcher = asyncio.ensure_future(self.__batch_loop())
+        self.__server = await asyncio.start_server(self.__handle_connection, HOST, self.__port)
+        self.__port = self.__server.sockets[0].getsockname()[1]
+        self.__started = time.monotonic()
+        return self.__port
+
+    async def serve_forever(self):
+        async with self.__server:
+            await self.__server.serve_forever()
+
+    # stops listening and waits for the batches already running
+
+    async def close(self):
+        if self.__server is not None:
+            self.__server.close()
+            await self.__server.wait_closed()
+        if self.__batcher is not None:
+            self.__batcher.cancel()
+            await asyncio.gather(self.__batcher, return_exceptions=True)
+        if self.__batches:
+            await asyncio.gather(*self.__batches, return_exceptions=True)
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+
+    # getter
+    def port(self):
+        return self.__port
+
+    # queue, batch and latency figures reported by GET /health
+
+    def health(self):
+        latencies = np.array(self.__latencies) * 1000
+        percentiles = {}
+        if len(latencies):
+            percentiles = {f'p{q}': float(np.percentile(latencies, q)) for q in (50, 90, 99)}
+            percentiles['max'] = float(latencies.max())
+        return {
+            'status': 'ok',
+            'uptime_seconds': time.monotonic() - self.__started,
+            'queue_length': self.__queue.qsize() + self.__gathering,
+            'queue_capacity': self.__queue_size,
+            'in_flight': self.__in_flight,
+            'workers': self.__workers,
+            'requests': self.__requests,
+            'rejected': self.__rejected,
+            'batches': self.__batch_count,
+            'mean_batch_size': self.__batched_requests / self.__batch_count if self.__batch_count else 0.0,
+            'latency_ms': percentiles,
+            'latency_samples': len(latencies),
+        }
+
+    # queues one upload and waits for its record; raises ServiceBusy when the queue is full
+
+    async def recognise(self, content_type, query, body):
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.__queue.put_nowait(((content_type, query, body), future))
+        except asyncio.QueueFull:
+            self.__rejected += 1
+            raise ServiceBusy()
+        return await future
+
+    # takes the first waiting request, lets the batch window collect more, and hands the batch to a
+    # worker once one is free; while every worker is busy the queue fills up and refuses requests
+
+    async def __batch_loop(self):
+        while True:
+            batch = [await self.__queue.get()]
+            self.__gathering = 1
+            if self.__batch_window > 0 and self.__max_batch > 1:
+                await asyncio.sleep(self.__batch_window)
+            while len(batch) < self.__max_batch and not self.__queue.empty():
+                batch.append(self.__queue.get_nowait())
+            self.__gathering = len(batch)
+
+            await self.__slots.acquire()
+            self.__gathering = 0
+            task = asyncio.ensure_future(self.__run_batch(batch))
+            self.__batches.add(task)
+            task.add_done_callback(self.__batches.discard)
+
+    async def __run_batch(self, batch):
+        self.__in_flight += len(batch)
+        self.__batch_count += 1
+        self.__batched_requests += len(batch)
+        try:
+            uploads = [upload for upload, _ in batch]
+            records = await asyncio.get_running_loop().run_in_executor(self.__executor, recognise_uploads, uploads)
+            for (_, future), (status, record) in zip(batch, records):
+                if not future.done():
+                    record['batch_size'] = len(batch)
+                    future.set_result((status, record))
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+        finally:
+            self.__in_flight -= len(batch)
+            self.__slots.release()
+
+    # serves requests on one connection until the client closes it or asks to
+
+    async def __handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self.__read_request(reader)
+                except BadRequest as error:
+                    await self.__respond(writer, error.status, {'error': str(error)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, path, query, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                status, payload, extra_headers = await self.__dispatch(method, path, query, headers, body)
+                await self.__respond(writer, status, payload, keep_alive, extra_headers)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # one line of the request head; a line longer than the reader's limit is answered with status
+
+    @staticmethod
+    async def __read_line(reader, status, message):
+        try:
+            return await reader.readline()
+        except (asyncio.LimitOverrunError, ValueError):
+            raise BadRequest(status, message)
+
+    # request line, headers and body of the next request, or None when the client has closed
+
+    async def __read_request(self, reader):
+        line = await self.__read_line(reader, 400, "request line too long")
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode('latin-1').split()
+        except ValueError:
+            raise BadRequest(400, "malformed request line")
+
+        headers = {}
+        while True:
+            line = await self.__read_line(reader, 431, "header line too long")
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        body = b''
+        if method == 'POST':
+            if 'content-length' not in headers:
+                raise BadRequest(411, "Content-Length required")
+            try:
+                length = int(headers['content-length'])
+            except ValueError:
+                raise BadRequest(400, "invalid Content-Length")
+            if length < 0:
+                raise BadRequest(400, "invalid Content-Length")
+            if length > self.__max_upload:
+                raise BadRequest(413, f"upload larger than {self.__max_upload} bytes")
+            body = await reader.readexactly(length)
+
+        url = urlsplit(target)
+        return method, url.path, dict(parse_qsl(url.query)), headers, body
+
+    async def __dispatch(self, method, path, query, headers, body):
+        if path == '/health':
+            if method != 'GET':
+                return 405, {'error': "use GET"}, {'Allow': 'GET'}
+            return 200, self.health(), {}
+
+        if path == '/recognise':
+            if method != 'POST':
+                return 405, {'error': "use POST"}, {'Allow': 'POST'}
+            start = time.perf_counter()
+            self.__requests += 1
+            try:
+                status, record = await self.recognise(headers.get('content-type', ''), query, body)
+            except ServiceBusy:
+                return 503, {'error': "queue full, retry later"}, {'Retry-After': '1'}
+            except Exception as error:
+                return 500, {'error': f"{type(error).__name__}: {error}"}, {}
+            self.__latencies.append(time.perf_counter() - start)
+            return status, record, {}
+
+        return 404, {'error': f"no endpoint {path}"}, {}
+
+    @staticmethod
+    async def __respond(writer, status, payload, keep_alive, extra_headers=None):
+        body = json.dumps(payload).encode()
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}", "Content-Type: application/json",
+                 f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in (extra_headers or {}).items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+
+# serves until SIGTERM or SIGINT, then closes the service so its pool workers exit with it
+
+async def _serve(service):
+    port = await service.start()
+    serving = asyncio.ensure_future(service.serve_forever())
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signal_number, serving.cancel)
+        except NotImplementedError:
+            # no signal handlers in the Windows event loop; Ctrl+C still raises KeyboardInterrupt
+            pass
+
+    print(f"Listening on http://{HOST}:{port} (POST /recognise, GET /health)", flush=True)
+    try:
+        await serving
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await service.close()
+
+
+# command line entry point: resistor-recognition serve [options]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="resistor-recognition serve",
+                                     description="Recognise resistors over HTTP on localhost")
+    parser.add_argument("--port", type=int, default=SERVICE_PORT, help="port on 127.0.0.1 (0 picks a free one)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of worker processes (default: one per CPU)")
+    parser.add_argument("--batch-window", type=float, default=SERVICE_BATCH_WINDOW,
+                        help="seconds a batch waits for more requests")
+    parser.add_argument("--max-batch", type=int, default=SERVICE_MAX_BATCH, help="largest batch")
+    parser.add_argument("--queue-size", type=int, default=SERVICE_QUEUE_SIZE,
+                        help="waiting requests before new ones get 503")
+    args = parser.parse_args(argv)
+
+    service = RecognitionService(port=args.port, processes=args.jobs, batch_window=args.batch_window,
+                                 max_batch=args.max_batch, queue_size=args.queue_size)
+    try:
+        asyncio.run(_serve(service))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+# import necessary libraries
+import cProfile
+import json
+import pstats
+import threading
+import time
+from collections import deque
+
+
+# opt-in spans around the recognition stages
+# nothing is recorded until a sink is added; until then span() hands back one shared object
+# whose enter and exit do nothing, so instrumented code costs a function call per span
+
+# sinks receiving spans, empty while tracing is disabled
+_sinks = ()
+_sinks_lock = threading.Lock()
+
+# stack of open spans for each thread
+_open_spans = threading.local()
+
+
+# one timed region: wall and CPU time, nesting, and attributes such as input sizes
+
+class Span:
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.parent = None
+        self.depth = 0
+        self.thread = None
+        self.start = None
+        self.wall_time = None
+        self.cpu_time = None
+        self.error = None
+        self.__sinks = _sinks
+
+    # adds attributes once they are known, e.g. the number of contours a stage found
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        stack = getattr(_open_spans, 'stack', None)
+        if stack is None:
+            stack = _open_spans.stack = []
+
+        if stack:
+            self.parent = stack[-1].name
+        self.depth = len(stack)
+        self.thread = threading.current_thread().name
+        stack.append(self)
+
+        for sink in self.__sinks:
+            sink.span_started(self)
+
+        self.start = time.time()
+        self.__wall_start = time.perf_counter()
+        self.__cpu_start = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.wall_time = time.perf_counter() - self.__wall_start
+        self.cpu_time = time.thread_time() - self.__cpu_start
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        _open_spans.stack.pop()
+
+        for sink in self.__sinks:
+            sink.span_finished(self)
+        return False
+
+    # plain dictionary for logs and JSON output
+
+    def record(self):
+        return {'name': self.name, 'parent': self.parent, 'depth': self.depth, 'thread': self.thread,
+                'start': self.start, 'wall_time': self.wall_time, 'cpu_time': self.cpu_time,
+                'error': self.error, 'attributes': self.attributes}
+
+
+# stands in for Span while tracing is disabled
+
+class _NullSpan:
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+# context manager timing a region, e.g. with span('crop', shape=img.shape):
+# attributes should be cheap to compute since they are evaluated even while tracing is disabled
+
+def span(name, **attributes):
+    if not _sinks:
+        return _null_span
+    return Span(name, attributes)
+
+
+def enabled():
+    return bool(_sinks)
+
+
+def add_sink(sink):
+    global _sinks
+    with _sinks_lock:
+        _sinks = _sinks + (sink,)
+    return sink
+
+
+def remove_sink(sink):
+    global _sinks
+    with _sinks_lock:
+        _sinks = tuple(active for active in _sinks if active is not sink)
+
+
+# traces the body of a with statement into the given sinks, closing them afterwards
+
+class tracing:
+
+    def __init__(self, *sinks):
+        self.__sinks = sinks
+
+    def __enter__(self):
+        for sink in self.__sinks:
+            add_sink(sink)
+        return self.__sinks[0] if len(self.__sinks) == 1 else self.__sinks
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for sink in self.__sinks:
+            remove_sink(sink)
+            sink.close()
+        return False
+
+
+# parent class of the sinks, every hook does nothing by default
+
+class TraceSink:
+
+    def span_started(self, span):
+        pass
+
+    def span_finished(self, span):
+        pass
+
+    def close(self):
+        pass
+
+
+# keeps the most recent finished spans in memory
+
+class RingSink(TraceSink):
+
+    def __init__(self, capacity=1000):
+        self.__records = deque(maxlen=capacity)
+        self.__lock = threading.Lock()
+
+    def span_finished(self, span):
+        with self.__lock:
+            self.__records.append(span.record())
+
+    def records(self):
+        with self.__lock:
+            return list(self.__records)
+
+    # total wall and CPU seconds and call count per span name
+
+    def summary(self):
+        totals = {}
+        for record in self.records():
+            total = totals.setdefault(record['name'], {'count': 0, 'wall_time': 0.0, 'cpu_time': 0.0})
+            total['count'] += 1
+            total['wall_time'] += record['wall_time']
+            total['cpu_time'] += record['cpu_time']
+        return totals
+
+    def clear(self):
+        with self.__lock:
+            self.__records.clear()
+
+
+# writes every finished span as one JSON line to a stream or to a file opened for appending
+
+class JsonLogSink(TraceSink):
+
+    def __init__(self, destination):
+        self.__owns_stream = isinstance(destination, str)
+        self.__stream = open(destination, 'a') if self.__owns_stream else destination
+        self.__lock = threading.Lock()
+
+    def span_finished(self, span):
+        line = json.dumps(span.record(), default=str) + '\n'
+        with self.__lock:
+            self.__stream.write(line)
+            self.__stream.flush()
+
+    def close(self):
+        if self.__owns_stream:
+            self.__stream.close()
+
+
+# profiles the code inside outermost spans with cProfile, writing the statistics on close
+# only one thread is profiled at a time: the one that opened the outermost span first
+
+class ProfileSink(TraceSink):
+
+    def __init__(self, path=None, names=None):
+        self.__path = path
+        self.__names = None if names is None else set(names)
+        self.__profile = cProfile.Profile()
+        self.__owner = None
+        self.__lock = threading.Lock()
+
+    def __profiled(self, span):
+        return span.depth == 0 and (self.__names is None or span.name in self.__names)
+
+    def span_started(self, span):
+        if self.__profiled(span):
+            with self.__lock:
+                if self.__owner is None:
+                    self.__owner = threading.get_ident()
+                    self.__profile.enable()
+
+    def span_finished(self, span):
+        if self.__profiled(span):
+            with self.__lock:
+                if self.__owner == threading.get_ident():
+                    self.__profile.disable()
+                    self.__owner = None
+
+    def stats(self):
+        return pstats.Stats(self.__profile)
+
+    def dump(self, path):
+        self.__profile.dump_stats(path)
+
+    def close(self):
+        if self.__path is not None:
+            self.dump(self.__path)
@@ -0,0 +1,120 @@
+# import necessary libraries
+import threading
+
+import numpy as np
+import cv2 as cv
+
+from config import TRACK_PADDING, TRACK_MAX_AREA_CHANGE, TRACK_MIN_SCORE_RATIO
+
+
+# follows the resistor from frame to frame, so localisation only searches around where it was last seen
+# the pipeline asks for a search window, checks the rectangle it finds there with confident(), and
+# reports every located frame with update(); anything unconvincing drops the track so the next frame
+# is searched in full again
+
+class ResistorTracker:
+
+    # initialise with the padding added to each side of the last rectangle (relative to its size), the
+    # largest relative change of rectangle area and the smallest ratio of template scores still trusted
+
+    def __init__(self, padding=TRACK_PADDING, max_area_change=TRACK_MAX_AREA_CHANGE,
+                 min_score_ratio=TRACK_MIN_SCORE_RATIO):
+        self.__padding = padding
+        self.__max_area_change = max_area_change
+        self.__min_score_ratio = min_score_ratio
+        self.__lock = threading.Lock()
+        self.__rectangle = None
+        self.__crop_location = None
+        self.__score = None
+        self.__tracked = 0
+        self.__full_searches = 0
+        self.__lost = 0
+
+    # region (x, y, width, height) to search in the next frame, or None without a track
+
+    def search_window(self, frame_shape):
+        with self.__lock:
+            rectangle = self.__rectangle
+        if rectangle is None:
+            return None
+
+        # axis aligned box around the rotated rectangle, padded on every side
+        x, y, width, height = cv.boundingRect(np.intp(cv.boxPoints(rectangle)))
+        pad = int(np.ceil(self.__padding * max(width, height)))
+        frame_height, frame_width = frame_shape[:2]
+        left, top = max(x - pad, 0), max(y - pad, 0)
+        right, bottom = min(x + width + pad, frame_width), min(y + height + pad, frame_height)
+        if right <= left or bottom <= top:
+            return None
+        return left, top, right - left, bottom - top
+
+    # whether a rectangle found in the search window can be trusted: it must not touch a window edge
+    # inside the frame (or it may have been cut off) and must have about the area of the last one
+
+    def confident(self, rectangle, window, frame_shape):
+        with self.__lock:
+            previous = self.__rectangle
+        if rectangle is None or previous is None:
+            return False
+
+        x, y, width, height = cv.boundingRect(np.intp(cv.boxPoints(rectangle)))
+        left, top, window_width, window_height = window
+        right, bottom = left + window_width, top + window_height
+        frame_height, frame_width = frame_shape[:2]
+        inside = ((left == 0 or x > left) and (top == 0 or y > top) and
+                  (right == frame_width or x + width < right) and (bottom == frame_height or y + height < bottom))
+
+        area = rectangle[1][0] * rectangle[1][1]
+        previous_area = previous[1][0] * previous[1][1]
+        if previous_area <= 0:
+            return False
+        return inside and abs(area / previous_area - 1) <= self.__max_area_change
+
+    # previous crop location, used to search the next crop only around it
+
+    def crop_hint(self):
+        with self.__lock:
+            return self.__crop_location if self.__rectangle is not None else None
+
+    # whether a crop found around the hint scores close enough to the last one
+
+    def crop_confident(self, score):
+        with self.__lock:
+            previous = self.__score
+        return previous is None or previous <= 0 or score >= self.__min_score_ratio * previous
+
+    # records where the resistor was found; tracked tells whether the search window was used
+
+    def update(self, rectangle, crop_location, score, tracked):
+        with self.__lock:
+            self.__rectangle = rectangle
+            self.__crop_location = crop_location
+            self.__score = score
+            if tracked:
+                self.__tracked += 1
+            else:
+                self.__full_searches += 1
+
+    # drops the track so the next frame is searched in full
+
+    def lose(self):
+        with self.__lock:
+            if self.__rectangle is not None:
+                self.__lost += 1
+            self.__rectangle = None
+            self.__crop_location = None
+            self.__score = None
+
+    # getters
+    def tracking(self):
+        with self.__lock:
+            return self.__rectangle is not None
+
+    def frames_tracked(self):
+        return self.__tracked
+
+    def full_searches(self):
+        return self.__full_searches
+
+    def times_lost(self):
+        return self.__lost
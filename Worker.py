@@ -0,0 +1,85 @@
+# import necessary libraries
+import queue
+import threading
+
+
+# runs capture analysis on a background thread so the Tk main loop never waits for it
+# results are collected by polling from the main thread, never pushed into Tk directly
+
+class AnalysisWorker:
+
+    # initialise with the function analysing one frame
+    # policy 'drop' ignores captures while one is in flight, 'queue' keeps up to max_queued waiting
+
+    def __init__(self, analyse, policy='drop', max_queued=0):
+        if policy not in ('drop', 'queue'):
+            raise ValueError(f"Unknown capture policy: {policy}")
+
+        self.__analyse = analyse
+        self.__max_in_flight = 1 if policy == 'drop' else 1 + max_queued
+        self.__in_flight = 0
+        self.__dropped = 0
+        self.__lock = threading.Lock()
+        self.__jobs = queue.Queue()
+        self.__results = queue.Queue()
+
+        self.__thread = threading.Thread(target=self.__run, name='analysis-worker', daemon=True)
+        self.__thread.start()
+
+    # hands a frame to the worker, returning False if it was dropped
+
+    def submit(self, frame):
+        with self.__lock:
+            if self.__in_flight >= self.__max_in_flight:
+                self.__dropped += 1
+                return False
+            self.__in_flight += 1
+
+        self.__jobs.put(frame)
+        return True
+
+    # analyse frames one at a time until stopped
+
+    def __run(self):
+        while True:
+            frame = self.__jobs.get()
+            if frame is None:
+                break
+
+            try:
+                result, error = self.__analyse(frame), None
+            except Exception as exception:
+                result, error = None, exception
+
+            self.__results.put((frame, result, error))
+            with self.__lock:
+                self.__in_flight -= 1
+
+    # finished (frame, result, error) tuples, without waiting
+
+    def poll(self):
+        finished = []
+        while True:
+            try:
+                finished.append(self.__results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    # getters
+    def busy(self):
+        with self.__lock:
+            return self.__in_flight > 0
+
+    def pending(self):
+        with self.__lock:
+            return self.__in_flight
+
+    def dropped(self):
+        with self.__lock:
+            return self.__dropped
+
+    # stops the thread once the frames already submitted are analysed
+
+    def stop(self, timeout=None):
+        self.__jobs.put(None)
+        self.__thread.join(timeout)
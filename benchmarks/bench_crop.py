@@ -0,0 +1,85 @@
+# benchmark pyramid template matching against the exhaustive search, and check they find the same crop
+# run from the project root: python benchmarks/bench_crop.py --sizes 640x480 1280x960 1920x1440
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import cv2 as cv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import READABLE_COLOURS, render_resistor
+from Preprocessing import CropImage
+from config import TEMPLATE_IMAGE, CROP_PYRAMID_LEVELS, CROP_REFINE_RADIUS
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+# best wall time over a number of repeats, with the result of the last call
+
+def best_time(function, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Template matching benchmark")
+    parser.add_argument("--sizes", type=parse_size, nargs='+', default=[(640, 480), (1280, 960)],
+                        metavar='WxH')
+    parser.add_argument("--images", type=int, default=10, help="synthetic images per size")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--levels", type=int, default=CROP_PYRAMID_LEVELS)
+    parser.add_argument("--radius", type=int, default=CROP_REFINE_RADIUS)
+    parser.add_argument("--min-agreement", type=float, default=1.0,
+                        help="exit 1 if fewer than this fraction of crops match the exhaustive location")
+    args = parser.parse_args(argv)
+
+    template = cv.imread(TEMPLATE_IMAGE, 0)
+    rng = np.random.default_rng(0)
+
+    agreed = total = 0
+    for width, height in args.sizes:
+        exhaustive_times, pyramid_times, offsets = [], [], []
+        for index in range(args.images):
+            # the resistor grows with the frame, as it would with a higher resolution camera
+            img = render_resistor(tuple(rng.choice(READABLE_COLOURS, 3)) + ('gold',),
+                                  rotation=float(rng.uniform(-5, 5)), scale=float(rng.uniform(0.8, 1.2)) * width / 640,
+                                  lighting=tuple(rng.uniform(0.85, 1.15, 3)), size=(width, height), seed=index)
+
+            # a CropImage remembers its location, so each repeat needs a new one
+            exhaustive_time, expected = best_time(
+                lambda: CropImage(img, template, mode='exhaustive').locate(), args.repeats)
+            pyramid_time, found = best_time(
+                lambda: CropImage(img, template, mode='pyramid', pyramid_levels=args.levels,
+                                  refine_radius=args.radius).locate(), args.repeats)
+
+            exhaustive_times.append(exhaustive_time)
+            pyramid_times.append(pyramid_time)
+            offsets.append(max(abs(found[0] - expected[0]), abs(found[1] - expected[1])))
+
+        offsets = np.array(offsets)
+        agreed += int(np.sum(offsets == 0))
+        total += len(offsets)
+        exhaustive_ms = np.median(exhaustive_times) * 1000
+        pyramid_ms = np.median(pyramid_times) * 1000
+        print(f"{width}x{height}: exhaustive {exhaustive_ms:.2f} ms, pyramid {pyramid_ms:.2f} ms "
+              f"({exhaustive_ms / pyramid_ms:.1f}x), identical {np.sum(offsets == 0)}/{len(offsets)}, "
+              f"largest offset {offsets.max()} px")
+
+    agreement = agreed / total
+    print(f"agreement with exhaustive search: {agreement:.1%}")
+    return 0 if agreement >= args.min_agreement else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
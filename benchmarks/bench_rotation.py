@@ -0,0 +1,81 @@
+# benchmark the rotation engine against the original per-pixel loop
+# run from the project root: python benchmarks/bench_rotation.py
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Preprocessing import RotateImage
+
+
+# the original nested loop, kept here only as the reference implementation
+
+def loop_rotated_image(img, rotation_matrix):
+    rotated_image = np.zeros_like(img)
+    for y in range(img.shape[0]):
+        for x in range(img.shape[1]):
+            new_x, new_y = np.dot(rotation_matrix, [x, y, 1])
+            new_x, new_y = int(new_x), int(new_y)
+            if 0 <= new_x < img.shape[1] and 0 <= new_y < img.shape[0]:
+                rotated_image[new_y, new_x] = img[y, x]
+    return rotated_image
+
+
+# builds a RotateImage ready to rotate by the given angle
+
+def prepared_rotation(img, angle, forward_mapping):
+    rotation = RotateImage(img, forward_mapping=forward_mapping)
+    rotation._RotateImage__rotation_angle = angle
+    rotation._set_rotation_matrix()
+    return rotation
+
+
+# best wall time over a number of repeats
+
+def best_time(function, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rotation engine benchmark")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--angle", type=float, default=33.3)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--skip-loop", action="store_true", help="do not time the original loop")
+    args = parser.parse_args(argv)
+
+    img = np.random.default_rng(0).integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+
+    forward = prepared_rotation(img, args.angle, True)
+    inverse = prepared_rotation(img, args.angle, False)
+
+    forward_time = best_time(forward._get_rotated_image, args.repeats)
+    inverse_time = best_time(inverse._get_rotated_image, args.repeats)
+
+    print(f"frame {args.width}x{args.height}, angle {args.angle}")
+    print(f"vectorised forward mapping: {forward_time * 1000:.2f} ms")
+    print(f"cached inverse remap:       {inverse_time * 1000:.2f} ms")
+
+    if not args.skip_loop:
+        start = time.perf_counter()
+        reference = loop_rotated_image(img, forward._get_rotation_matrix())
+        loop_time = time.perf_counter() - start
+
+        print(f"original per-pixel loop:    {loop_time * 1000:.2f} ms")
+        print(f"speedup (forward / remap):  {loop_time / forward_time:.0f}x / {loop_time / inverse_time:.0f}x")
+        print("forward mapping identical to loop:", np.array_equal(reference, forward._get_rotated_image()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+# per-stage benchmark over synthetic resistor images, with an optional regression check
+# run from the project root:
+#   python benchmarks/bench_stages.py --output results.json
+#   python benchmarks/bench_stages.py --save-baseline benchmarks/baseline.json
+#   python benchmarks/bench_stages.py                               (exits 1 on regression)
+# the committed benchmarks/baseline.json is compared against by default; times depend on the machine,
+# so re-save it on the machine the check runs on, or pass --no-baseline
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import cv2 as cv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import READABLE_COLOURS, render_resistor
+from Preprocessing import RotateImage, CropImage, WhitebalanceImage, WhitebalanceReference, WhitebalanceGains
+from Bands import (
+    ColourClassifier, GoldBand, BrownBands, BlackBands, GreenBands, YellowBands,
+    BlueBands, OrangeBands, GreyBands, RedBands, VioletBands, WhiteBands
+)
+from Analysis import UniqueBands, SortBands, SortColours
+from config import TEMPLATE_IMAGE, REFERENCE_IMAGE, THRESHOLD_VALUE
+
+DETECTORS = (('gold', GoldBand), ('brown', BrownBands), ('green', GreenBands), ('violet', VioletBands),
+             ('yellow', YellowBands), ('red', RedBands), ('black', BlackBands), ('orange', OrangeBands),
+             ('blue', BlueBands), ('white', WhiteBands), ('grey', GreyBands))
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+# times a call and returns its result, appending the elapsed seconds to timings[name]
+
+def timed(timings, name, function):
+    start = time.perf_counter()
+    result = function()
+    timings.setdefault(name, []).append(time.perf_counter() - start)
+    return result
+
+
+def rotate(img, contours):
+    rotation = RotateImage(img)
+    rotation._set_bounding_rectangle(contours)
+    rotation._set_rotation_angle()
+    rotation._set_rotation_matrix()
+    return rotation._get_rotated_image()
+
+
+# runs every stage once on one image, feeding each stage the previous stage's output
+
+def run_stages(img, template, reference, gains, timings):
+    gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
+    _, threshold = cv.threshold(gray, THRESHOLD_VALUE, 255, cv.THRESH_BINARY_INV)
+    contours, _ = cv.findContours(threshold, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
+
+    rotated = timed(timings, 'RotateImage', lambda: rotate(img, contours))
+    cropped = timed(timings, 'CropImage', lambda: CropImage(rotated, template).get_cropped_image())
+    balanced = timed(timings, 'WhitebalanceImage',
+                     lambda: WhitebalanceImage(cropped, reference).final_whitebalanced())
+    timed(timings, 'WhitebalanceGains', lambda: gains.whitebalance(cropped))
+
+    # each detector on its own, as a standalone caller would run it
+    combined_image = np.zeros_like(balanced)
+    colour_contours = {}
+    for colour, detector in DETECTORS:
+        colour_contours[colour], combined_image = timed(
+            timings, detector.__name__, lambda: detector(balanced, combined_image).colour_band_image())
+
+    timed(timings, 'ColourClassifier', lambda: ColourClassifier(balanced).labels())
+
+    gray_combined = cv.cvtColor(combined_image, cv.COLOR_BGR2GRAY)
+    _, combined_threshold = cv.threshold(gray_combined, 1, 255, cv.THRESH_BINARY)
+    band_contours, _ = cv.findContours(combined_threshold, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+
+    selected = timed(timings, 'UniqueBands', lambda: UniqueBands(band_contours).find_unique_bands())
+    ordered = timed(timings, 'SortBands', lambda: SortBands(selected).sort_contours())
+
+    # an image without bands leaves nothing to assign, and colour_assignment never returned for one,
+    # so it is only timed when bands were found
+    if len(ordered) == 0:
+        return
+    timed(timings, 'SortColours', lambda: SortColours(
+        ordered, colour_contours['orange'], colour_contours['red'], colour_contours['green'],
+        colour_contours['blue'], colour_contours['yellow'], colour_contours['black'], colour_contours['brown'],
+        colour_contours['gold'], colour_contours['white'], colour_contours['violet']).colour_assignment())
+
+
+def summarise(samples):
+    samples = np.array(samples)
+    return {'median': float(np.median(samples)), 'mean': float(samples.mean()), 'min': float(samples.min()),
+            'p90': float(np.percentile(samples, 90)), 'count': int(len(samples))}
+
+
+def benchmark(images, iterations):
+    template = cv.imread(TEMPLATE_IMAGE, 0)
+    reference = WhitebalanceReference(cv.imread(REFERENCE_IMAGE))
+    gains = WhitebalanceGains(reference)
+
+    # one untimed pass warms up lookup tables and remap caches
+    for img in images:
+        run_stages(img, template, reference, gains, {})
+
+    timings = {}
+    for _ in range(iterations):
+        for img in images:
+            run_stages(img, template, reference, gains, timings)
+    return {stage: summarise(samples) for stage, samples in timings.items()}
+
+
+# stages whose median got slower than the baseline allows
+
+def regressions(results, baseline, tolerance, slack):
+    slower = []
+    for stage, stats in baseline['stages'].items():
+        if stage in results:
+            allowed = stats['median'] * (1 + tolerance) + slack
+            if results[stage]['median'] > allowed:
+                slower.append((stage, stats['median'], results[stage]['median']))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage recognition benchmark")
+    parser.add_argument("--images", type=int, default=4, help="number of synthetic images")
+    parser.add_argument("--iterations", type=int, default=5, help="passes over the images")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--max-rotation", type=float, default=25.0)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--noise", type=float, default=4.0)
+    parser.add_argument("--lighting", type=float, nargs=3, default=(1.0, 1.0, 1.0), metavar=('B', 'G', 'R'))
+    parser.add_argument("--output", help="write the results JSON here instead of standard output")
+    parser.add_argument("--save-baseline", help="write the results as a baseline file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="compare against this baseline and exit 1 on regression")
+    parser.add_argument("--no-baseline", action='store_true', help="skip the comparison with a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown of a median")
+    parser.add_argument("--slack", type=float, default=0.0005, help="allowed absolute slowdown in seconds")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    # counter-clockwise tilts only: RotateImage turns a clockwise tilted resistor upright instead of level,
+    # and the stages after it would then time images without bands
+    images = [render_resistor(tuple(rng.choice(READABLE_COLOURS, 3)) + ('gold',),
+                              rotation=float(rng.uniform(0, args.max_rotation)),
+                              scale=args.scale, noise=args.noise, lighting=tuple(args.lighting),
+                              size=(args.width, args.height), seed=index)
+              for index in range(args.images)]
+
+    results = {
+        'environment': {'python': platform.python_version(), 'opencv': cv.__version__, 'numpy': np.__version__,
+                        'machine': platform.machine()},
+        'parameters': {key: value for key, value in vars(args).items()
+                       if key not in ('output', 'save_baseline', 'baseline', 'no_baseline')},
+        'stages': benchmark(images, args.iterations),
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(text + '\n')
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as output:
+            output.write(text + '\n')
+
+    if args.no_baseline or args.save_baseline:
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; save one with --save-baseline", file=sys.stderr)
+        return 0 if args.baseline == DEFAULT_BASELINE else 1
+
+    with open(args.baseline) as baseline_file:
+        slower = regressions(results['stages'], json.load(baseline_file), args.tolerance, args.slack)
+    for stage, before, after in slower:
+        print(f"REGRESSION {stage}: median {before * 1000:.3f} ms -> {after * 1000:.3f} ms", file=sys.stderr)
+    return 1 if slower else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
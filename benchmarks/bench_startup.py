@@ -0,0 +1,109 @@
+# GUI startup benchmark: every measurement runs in a fresh interpreter, as a launch would
+# run from the project root:
+#   python benchmarks/bench_startup.py --output startup.json
+# the homepage is only timed when a display is available; imports are always timed
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Artwork import derivative_path
+from config import BACKGROUND_IMAGE, LOGO_IMAGE, LOGO_SUBSAMPLE, WINDOW_WIDTH, WINDOW_HEIGHT
+
+# each snippet prints the seconds it took
+SNIPPETS = {
+    # what gui.py imports before the homepage can be built
+    'import_frontend': """
+import time
+start = time.perf_counter()
+import FrontEnd
+print(time.perf_counter() - start)
+""",
+    # what the camera screen (or the background preload) imports
+    'import_vision_stack': """
+import time
+start = time.perf_counter()
+import FrontEnd
+FrontEnd._preload_vision_stack()
+print(time.perf_counter() - start)
+""",
+    # launch until the homepage has been drawn
+    'homepage': """
+import time
+start = time.perf_counter()
+import tkinter as tk
+from FrontEnd import GUI
+root = tk.Tk()
+frontend = GUI(root)
+frontend.interface()
+root.update()
+print(time.perf_counter() - start)
+root.destroy()
+""",
+}
+
+
+# seconds printed by a snippet run in a new interpreter
+
+def run_snippet(code):
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True, text=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+# removes the stored homepage images, so the next launch has to build them
+
+def clear_derivatives():
+    for path in (derivative_path(BACKGROUND_IMAGE, size=(WINDOW_WIDTH, WINDOW_HEIGHT)),
+                 derivative_path(LOGO_IMAGE, subsample=LOGO_SUBSAMPLE)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def summarise(samples):
+    samples = np.array(samples)
+    return {'median': float(np.median(samples)), 'min': float(samples.min()), 'max': float(samples.max()),
+            'count': int(len(samples))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GUI startup benchmark")
+    parser.add_argument("--repeats", type=int, default=5, help="launches per measurement")
+    parser.add_argument("--output", help="write the results JSON here instead of standard output")
+    args = parser.parse_args(argv)
+
+    measurements = {name: [run_snippet(SNIPPETS[name]) for _ in range(args.repeats)]
+                    for name in ('import_frontend', 'import_vision_stack')}
+
+    display = sys.platform in ('win32', 'darwin') or bool(os.environ.get('DISPLAY'))
+    if display:
+        # the first launch after an asset changes builds the derivatives, later ones only read them
+        cold = []
+        for _ in range(args.repeats):
+            clear_derivatives()
+            cold.append(run_snippet(SNIPPETS['homepage']))
+        measurements['homepage_cold'] = cold
+        measurements['homepage'] = [run_snippet(SNIPPETS['homepage']) for _ in range(args.repeats)]
+
+    results = {'python': platform.python_version(), 'platform': platform.platform(), 'display': display,
+               'repeats': args.repeats,
+               'measurements': {name: summarise(samples) for name, samples in measurements.items()}}
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# measure peak memory of the white balance stage before and after the native resolution patch
+# run from the project root: python benchmarks/bench_whitebalance_memory.py
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import cv2 as cv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Preprocessing import WhitebalanceImage
+from config import REFERENCE_IMAGE
+
+
+# the original patch extraction, upsampling the whole image 20 times
+
+def legacy_extract_white_patch(image):
+    result_patch = cv.resize(image, None, fx=20, fy=20)
+    return result_patch[60: 75, 300: 315]
+
+
+# white balance one cropped-sized image and report peak memory for this process
+
+def measure(mode, repeats):
+    if mode == 'legacy':
+        WhitebalanceImage.extract_white_patch = staticmethod(legacy_extract_white_patch)
+
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (645, 600, 3), dtype=np.uint8)
+    reference_image = cv.imread(REFERENCE_IMAGE)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        WhitebalanceImage(image, reference_image).final_whitebalanced()
+    elapsed = (time.perf_counter() - start) / repeats
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        max_rss *= 1024
+
+    return {'mode': mode, 'tracemalloc_peak_bytes': traced_peak, 'peak_rss_bytes': max_rss,
+            'seconds_per_call': elapsed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="White balance memory benchmark")
+    parser.add_argument("--mode", choices=['legacy', 'current'], help="measure a single mode in this process")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.repeats)))
+        return
+
+    # each mode runs in a fresh process so peak RSS is not shared between them
+    results = []
+    for mode in ('legacy', 'current'):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--mode', mode,
+                                 '--repeats', str(args.repeats)], check=True, capture_output=True, text=True)
+        results.append(json.loads(output.stdout))
+
+    for result in results:
+        print(f"{result['mode']:>8}: tracemalloc peak {result['tracemalloc_peak_bytes'] / 2 ** 20:8.2f} MiB, "
+              f"peak RSS {result['peak_rss_bytes'] / 2 ** 20:8.2f} MiB, "
+              f"{result['seconds_per_call'] * 1000:8.2f} ms per call")
+
+
+if __name__ == '__main__':
+    main()
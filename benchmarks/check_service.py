@@ -0,0 +1,223 @@
+# end to end check of the local HTTP recognition service: starts `gui.py serve` on a free port and
+# checks the status codes of good, bad and surplus requests and the /health report
+# run from the project root:
+#   python benchmarks/check_service.py          (exits 1 when a check fails)
+
+import argparse
+import http.client
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import cv2 as cv
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import render_resistor
+
+
+# one request on its own connection; returns the status and the decoded JSON body
+
+def request(port, method, path, body=None, headers=None, timeout=60):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+# sends several requests at once, so the service batches them; returns (status, body) in request order
+
+def concurrent_requests(port, uploads):
+    results = [None] * len(uploads)
+
+    def send(index, path, body, headers):
+        results[index] = request(port, 'POST', path, body, headers)
+
+    threads = [threading.Thread(target=send, args=(index,) + upload) for index, upload in enumerate(uploads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+# status of a request written byte for byte, for heads http.client would not send
+
+def raw_request(port, head):
+    with socket.create_connection(('127.0.0.1', port), timeout=60) as connection:
+        connection.sendall(head)
+        response = connection.makefile('rb').readline()
+    return int(response.split()[1]) if response else None
+
+
+# process ids whose parent is pid, read from /proc; None where there is no /proc
+
+def child_pids(pid):
+    if not os.path.isdir('/proc'):
+        return None
+    children = []
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as stat:
+                    # the parent id follows the parenthesised command name
+                    parent = int(stat.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            if parent == pid:
+                children.append(int(entry))
+    return children
+
+
+def running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def npy_bytes(array):
+    stream = io.BytesIO()
+    np.save(stream, array)
+    return stream.getvalue()
+
+
+def npz_bytes(array):
+    stream = io.BytesIO()
+    np.savez(stream, frame=array)
+    return stream.getvalue()
+
+
+def check(checks, name, passed, detail=''):
+    checks.append(passed)
+    print(f"{'ok  ' if passed else 'FAIL'} {name}{': ' + str(detail) if detail else ''}")
+
+
+def run_checks(port, overload, checks):
+    image = render_resistor(('yellow', 'violet', 'red', 'gold'), size=(640, 480))
+    png = cv.imencode('.png', image)[1].tobytes()
+    npy = npy_bytes(image)
+    png_upload = ('/recognise', png, {'Content-Type': 'image/png'})
+
+    # every supported upload format is accepted
+    status, record = request(port, 'POST', *png_upload)
+    check(checks, 'png upload gives 200', status == 200, status)
+    check(checks, 'png upload gives a record',
+          {'colours', 'resistance', 'ohms', 'batch_size'} <= set(record), sorted(record))
+    status, record = request(port, 'POST', '/recognise', npy, {'Content-Type': 'application/x-npy'})
+    check(checks, 'npy upload gives 200', status == 200, status)
+    status, record = request(port, 'POST', '/recognise?width=640&height=480', image.tobytes(),
+                             {'Content-Type': 'application/octet-stream'})
+    check(checks, 'raw upload gives 200', status == 200, status)
+
+    # bad uploads get 400 each, while the good request batched with them is still answered
+    bad_uploads = {
+        'garbage image': ('/recognise', b'garbage', {'Content-Type': 'image/png'}),
+        'empty body': ('/recognise', b'', {'Content-Type': 'image/png'}),
+        'truncated npy': ('/recognise', npy[:100], {'Content-Type': 'application/x-npy'}),
+        'npz archive': ('/recognise', npz_bytes(image), {'Content-Type': 'application/x-npy'}),
+        'raw size mismatch': ('/recognise?width=10&height=10', b'\0' * 7,
+                              {'Content-Type': 'application/octet-stream'}),
+    }
+    results = concurrent_requests(port, [png_upload] + list(bad_uploads.values()))
+    check(checks, 'good upload batched with bad ones gives 200', results[0][0] == 200, results[0][0])
+    for name, (status, record) in zip(bad_uploads, results[1:]):
+        check(checks, f'{name} gives 400', status == 400, f"{status} {record.get('error')}")
+
+    # malformed requests are answered rather than dropped
+    status, _ = request(port, 'POST', '/recognise', png, {'Content-Type': 'image/png', 'X-Long': 'x' * 70000})
+    check(checks, 'over-long header line gives 431', status == 431, status)
+    status, _ = request(port, 'GET', '/health?' + 'x' * 70000)
+    check(checks, 'over-long request line gives 400', status == 400, status)
+    status = raw_request(port, b'POST /recognise HTTP/1.1\r\nContent-Length: -5\r\n\r\n')
+    check(checks, 'negative Content-Length gives 400', status == 400, status)
+    check(checks, 'GET /recognise gives 405', request(port, 'GET', '/recognise')[0] == 405)
+    check(checks, 'unknown path gives 404', request(port, 'GET', '/missing')[0] == 404)
+
+    # more requests than the queue holds: the surplus is refused
+    statuses = Counter(status for status, _ in concurrent_requests(port, [png_upload] * overload))
+    check(checks, 'overload gives 200s and 503s', statuses[200] > 0 and statuses[503] > 0, dict(statuses))
+    check(checks, 'overload gives nothing else', set(statuses) <= {200, 503}, dict(statuses))
+
+    # health report, on a kept-alive connection
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    for _ in range(2):
+        connection.request('GET', '/health')
+        response = connection.getresponse()
+        health = json.loads(response.read())
+    connection.close()
+    check(checks, '/health gives 200 on a kept-alive connection', response.status == 200, response.status)
+    check(checks, '/health counts requests',
+          health.get('requests', 0) > 0 and health.get('rejected', 0) > 0,
+          {key: health.get(key) for key in ('requests', 'rejected', 'batches', 'mean_batch_size')})
+    check(checks, '/health reports latency', 'p50' in health.get('latency_ms', {}), health.get('latency_ms'))
+
+
+
+# stops the service with SIGTERM, as a process manager would, and checks its pool workers exit with it
+
+def check_shutdown(service, checks):
+    workers = child_pids(service.pid)
+    service.terminate()
+    try:
+        code = service.wait(30)
+    except subprocess.TimeoutExpired:
+        service.kill()
+        code = service.wait()
+    check(checks, 'SIGTERM stops the service', code == 0, code)
+
+    if workers is None:
+        return
+    deadline = time.monotonic() + 10
+    while any(running(pid) for pid in workers) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    left = [pid for pid in workers if running(pid)]
+    check(checks, 'no pool worker outlives the service', bool(workers) and not left,
+          f"{len(workers)} workers, left {left}")
+    for pid in left:
+        os.kill(pid, 9)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End to end check of the local recognition service")
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="worker processes of the service")
+    parser.add_argument("--queue-size", type=int, default=8, help="queue depth of the service")
+    parser.add_argument("--overload", type=int, default=40, help="simultaneous requests sent to force 503s")
+    args = parser.parse_args(argv)
+
+    command = [sys.executable, os.path.join(ROOT, 'gui.py'), 'serve', '--port', '0', '-j', str(args.jobs),
+               '--queue-size', str(args.queue_size), '--max-batch', '8', '--batch-window', '0.05']
+    service = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+    checks = []
+    try:
+        # "Listening on http://127.0.0.1:PORT (...)"
+        line = service.stdout.readline()
+        if not line.startswith('Listening on'):
+            print(f"Service did not start: {line!r}", file=sys.stderr)
+            return 1
+        port = int(line.split()[2].rsplit(':', 1)[1])
+        run_checks(port, args.overload, checks)
+    finally:
+        check_shutdown(service, checks)
+
+    passed = all(checks)
+    print('all checks passed' if passed else 'some checks failed')
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
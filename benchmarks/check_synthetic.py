@@ -0,0 +1,65 @@
+# checks that the recognition pipeline reads back the bands benchmarks/synthetic.py renders, so the
+# benchmarks time real detections rather than empty masks
+# run from the project root:
+#   python benchmarks/check_synthetic.py          (exits 1 when a rendered resistor is misread)
+# every readable colour is rendered in every digit position, level and tilted counter-clockwise;
+# clockwise tilts are not checked, as RotateImage does not level them
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import READABLE_COLOURS, render_resistor
+from Pipeline import RecognitionPipeline
+
+
+# band sequences covering each readable colour in each of the three digit positions
+
+def band_sequences():
+    colours = READABLE_COLOURS
+    return [tuple(colours[(index + offset) % len(colours)] for offset in (0, 2, 4)) + ('gold',)
+            for index in range(len(colours))]
+
+
+# colours the pipeline reads from one rendered resistor, or the error it raised
+
+def read_back(bands, rotation, seed):
+    pipeline = RecognitionPipeline()
+    pipeline.load_frame(render_resistor(bands, rotation=rotation, seed=seed))
+    try:
+        return list(pipeline.sorted_colours())
+    except Exception as error:
+        return f"{type(error).__name__}: {error}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the pipeline reads synthetic resistors correctly")
+    parser.add_argument("--rotations", type=float, nargs='+', default=(0.0, 5.0, 15.0, 25.0),
+                        help="counter-clockwise tilts in degrees")
+    parser.add_argument("--seeds", type=int, default=2, help="noise patterns per resistor and tilt")
+    args = parser.parse_args(argv)
+
+    failures = total = 0
+    for rotation in args.rotations:
+        read = 0
+        for bands in band_sequences():
+            for seed in range(args.seeds):
+                colours = read_back(bands, rotation, seed)
+                total += 1
+                if colours == list(bands):
+                    read += 1
+                else:
+                    failures += 1
+                    print(f"FAIL {rotation:g} deg, seed {seed}: rendered {', '.join(bands)}, read {colours}")
+        print(f"{rotation:g} deg: {read}/{len(band_sequences()) * args.seeds} read correctly")
+
+    print('all resistors read correctly' if failures == 0 else f"{failures}/{total} resistors misread")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
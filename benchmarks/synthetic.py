@@ -0,0 +1,116 @@
+# renders synthetic resistor photos with known band colours for benchmarks
+# band colours are calibrated so that, after the crop and white balancing, they land inside config.HSV_RANGES,
+# and at scale 1 a band covers 500 to 700 pixels of the white balanced crop, inside the component area
+# window of every readable colour's detector (a minimum of at most 200, a maximum of 1300)
+
+import os
+import sys
+
+import numpy as np
+import cv2 as cv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Preprocessing import WhitebalanceImage
+from config import HSV_RANGES, REFERENCE_IMAGE
+
+# colours of the scene before lighting is applied (BGR)
+# the body is darker than config.THRESHOLD_VALUE, so localisation finds the body rather than a band
+BACKGROUND_COLOUR = (185, 190, 192)
+BODY_COLOUR = (95, 130, 150)
+LEAD_COLOUR = (150, 150, 150)
+
+# band colours the pipeline can read: black and white components are dropped by their own area limits
+# (a minimum above the 1300 maximum), and grey is not assigned by SortColours; gold is the tolerance band
+READABLE_COLOURS = ('brown', 'red', 'orange', 'yellow', 'green', 'blue', 'violet')
+
+# calibrated band colours, computed on first use
+_band_colours = None
+
+
+# finds, for every configured colour, the BGR value whose white balanced HSV is closest to the centre of its range
+
+def calibrate_band_colours(background=BACKGROUND_COLOUR, step=8):
+    values = np.arange(step // 2, 256, step)
+    candidates = np.stack(np.meshgrid(values, values, values, indexing='ij'), -1).reshape(-1, 3).astype(np.uint8)
+
+    # lay the candidates out below a strip of background, where the white patch is taken from
+    rows = len(candidates) // 450 + 1
+    image = np.empty((350, 450, 3), np.uint8)
+    image[:] = background
+    block = image[20:20 + rows].reshape(-1, 3)
+    block[:len(candidates)] = candidates
+    image[20:20 + rows] = block.reshape(rows, 450, 3)
+
+    # CropImage hands the white balancing its crop with the channels reversed
+    image = np.ascontiguousarray(image[:, :, ::-1])
+    balanced = WhitebalanceImage(image, cv.imread(REFERENCE_IMAGE)).final_whitebalanced()
+    hsv = cv.cvtColor(balanced, cv.COLOR_BGR2HSV)[20:20 + rows].reshape(-1, 3)[:len(candidates)].astype(float)
+
+    colours = {}
+    for colour, hsv_range in HSV_RANGES.items():
+        lower = np.array(hsv_range['lower'], float)
+        upper = np.array(hsv_range['upper'], float)
+        centre = (lower + upper) / 2
+        half_width = np.maximum((upper - lower) / 2, 1)
+        distance = np.abs((hsv - centre) / half_width).max(axis=1)
+        colours[colour] = tuple(int(value) for value in candidates[np.argmin(distance)])
+    return colours
+
+
+def band_colours():
+    global _band_colours
+    if _band_colours is None:
+        _band_colours = calibrate_band_colours()
+    return _band_colours
+
+
+# renders one resistor photo
+# rotation in degrees, scale relative to the template size, noise as the standard deviation of
+# gaussian brightness noise (the same on all three channels, so it leaves hues alone), and lighting as a
+# per-channel (B, G, R) gain applied to the whole scene
+
+def render_resistor(bands=('yellow', 'violet', 'red', 'gold'), rotation=0.0, scale=1.0, noise=4.0,
+                    lighting=(1.0, 1.0, 1.0), size=(640, 480), seed=0):
+    rng = np.random.default_rng(seed)
+    width, height = size
+    colours = band_colours()
+
+    scene = np.empty((height, width, 3), np.uint8)
+    scene[:] = BACKGROUND_COLOUR
+
+    # body as wide as the template resistor, with evenly spaced bands
+    body_width, body_height = int(260 * scale), int(36 * scale)
+    band_width = max(int(8 * scale), 2)
+    body = np.empty((body_height, body_width, 3), np.uint8)
+    body[:] = BODY_COLOUR
+    for x, colour in zip(np.linspace(0.15, 0.85, len(bands)) * body_width, bands):
+        x = int(x)
+        body[:, x - band_width // 2: x + band_width // 2] = colours[colour]
+
+    centre_x, centre_y = width // 2, height // 2
+    cv.line(scene, (centre_x - int(300 * scale), centre_y), (centre_x + int(300 * scale), centre_y), LEAD_COLOUR,
+            max(int(4 * scale), 1))
+    top, left = centre_y - body_height // 2, centre_x - body_width // 2
+    scene[top:top + body_height, left:left + body_width] = body
+
+    matrix = cv.getRotationMatrix2D((centre_x, centre_y), rotation, 1.0)
+    scene = cv.warpAffine(scene, matrix, (width, height), borderValue=BACKGROUND_COLOUR)
+
+    lit = scene.astype(np.float64) * np.array(lighting, dtype=np.float64)
+    lit += rng.normal(0, noise, lit.shape[:2])[:, :, None]
+    return np.clip(lit, 0, 255).astype(np.uint8)
+
+
+# writes a small set of images for manual runs, e.g. python benchmarks/synthetic.py out_dir 20
+
+if __name__ == '__main__':
+    output_dir = sys.argv[1] if len(sys.argv) > 1 else 'synthetic_resistors'
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    os.makedirs(output_dir, exist_ok=True)
+
+    rng = np.random.default_rng(0)
+    for index in range(count):
+        bands = tuple(rng.choice(READABLE_COLOURS, 3)) + ('gold',)
+        image = render_resistor(bands, rotation=float(rng.uniform(-30, 30)), seed=index)
+        cv.imwrite(os.path.join(output_dir, f"{index:04d}_{'-'.join(bands)}.png"), image)
@@ -12,6 +12,12 @@ LOGO_IMAGE = os.path.join(ASSETS_DIR, 'logo.png')
 TEMPLATE_IMAGE = os.path.join(ASSETS_DIR, 'resistor_template.jpg')
 REFERENCE_IMAGE = os.path.join(ASSETS_DIR, 'reference.jpg')
 
+# Homepage images are stored once at the size they are shown at, so later launches decode only those
+# pixels; the vision libraries are imported in the background once the homepage is up (STARTUP_PRELOAD)
+ASSET_CACHE_DIR = os.path.join(BASE_DIR, '.cache', 'assets')
+LOGO_SUBSAMPLE = 4
+STARTUP_PRELOAD = True
+
 # Window dimensions
 WINDOW_WIDTH = 850
 WINDOW_HEIGHT = 550
@@ -22,6 +28,74 @@ FRAME_HEIGHT = 490
 THRESHOLD_VALUE = 140
 MIN_CONTOUR_AREA = 200
 CAMERA_UPDATE_INTERVAL = 10
+CAMERA_INDEX = 0
+
+# Frames wider than LOCALISATION_MAX_WIDTH are located on a copy downscaled to that width, and only a
+# square region around the resistor (its diagonal times ROI_PADDING) is rotated and cropped at full size
+LOCALISATION_MAX_WIDTH = 800
+ROI_PADDING = 1.2
+
+# Live tracking: the next frame is searched only in the previous resistor rectangle padded by
+# TRACK_PADDING times its size on each side, and its crop only CROP_HINT_RADIUS pixels around the
+# previous one; the full frame is searched again when the rectangle area changes by more than
+# TRACK_MAX_AREA_CHANGE (relative) or the template score falls below TRACK_MIN_SCORE_RATIO of the last
+LIVE_TRACKING = True
+TRACK_PADDING = 0.5
+TRACK_MAX_AREA_CHANGE = 0.5
+TRACK_MIN_SCORE_RATIO = 0.6
+CROP_HINT_RADIUS = 8
+
+# Template matching used to crop the resistor: 'exhaustive' searches the full resolution frame,
+# 'pyramid' matches CROP_PYRAMID_LEVELS halvings down and refines within CROP_REFINE_RADIUS pixels
+# the pyramid search is faster but can settle on a different location, so it is opt-in
+CROP_MATCH_MODE = 'exhaustive'
+CROP_PYRAMID_LEVELS = 2
+CROP_REFINE_RADIUS = 8
+
+# Session white balance: the GUI estimates the white balance correction once and follows slow lighting
+# changes, each frame weighing WHITEBALANCE_GAIN_SMOOTHING; a white patch that moves further than
+# WHITEBALANCE_DRIFT_THRESHOLD (relative) from the estimate triggers a fresh estimate
+WHITEBALANCE_SESSION_GAINS = True
+WHITEBALANCE_GAIN_SMOOTHING = 0.2
+WHITEBALANCE_DRIFT_THRESHOLD = 0.1
+
+# Pipelines write their intermediate images into arrays kept from frame to frame instead of allocating
+# new ones for every frame (see Buffers.BufferPool)
+REUSE_FRAME_BUFFERS = True
+
+# Capture analysis (runs on a background worker)
+# 'drop' ignores captures while one is being analysed, 'queue' keeps up to CAPTURE_QUEUE_SIZE waiting
+CAPTURE_POLICY = 'drop'
+CAPTURE_QUEUE_SIZE = 2
+RESULT_POLL_INTERVAL = 50
+
+# Captures that look the same as a recent one reuse its result: their perceptual hashes may differ
+# in at most RESULT_CACHE_MAX_DISTANCE bits and their 64x48 thumbnails by at most
+# RESULT_CACHE_PIXEL_TOLERANCE per pixel; up to RESULT_CACHE_SIZE results are kept
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_SIZE = 32
+RESULT_CACHE_MAX_DISTANCE = 24
+RESULT_CACHE_PIXEL_TOLERANCE = 12
+
+# Live recognition: analyse every LIVE_FRAME_STRIDE-th frame (up to LIVE_MAX_FRAME_STRIDE when
+# analysis falls behind) and report the band sequence read in most of the last LIVE_VOTE_WINDOW frames
+LIVE_FRAME_STRIDE = 5
+LIVE_MAX_FRAME_STRIDE = 60
+LIVE_VOTE_WINDOW = 5
+
+# Local recognition service (resistor-recognition serve): listens on 127.0.0.1:SERVICE_PORT, gathers
+# requests arriving within SERVICE_BATCH_WINDOW seconds into batches of up to SERVICE_MAX_BATCH, and
+# answers 503 while SERVICE_QUEUE_SIZE requests are already waiting; latency percentiles cover the last
+# SERVICE_LATENCY_WINDOW requests
+SERVICE_PORT = 8765
+SERVICE_BATCH_WINDOW = 0.005
+SERVICE_MAX_BATCH = 8
+SERVICE_QUEUE_SIZE = 32
+SERVICE_MAX_UPLOAD = 32 * 1024 * 1024
+SERVICE_LATENCY_WINDOW = 1000
+
+# Which of several bands overlapping in x is used: 'first' found, or 'largest' by area
+BAND_SELECTION = 'first'
 
 # Color detection parameters
 HSV_RANGES = {
@@ -1,11 +1,23 @@
-# import pre-built Tkinter library for GUI
-import tkinter as tk
-
-# import self-created classes from respective program files
-from FrontEnd import GUI
+# import necessary libraries
+# tkinter is imported only for the window, so batch and serve run on machines without Tk
+import sys
 
 # run main to launch user interface window and process image
 def main():
+    # headless batch recognition: resistor-recognition batch PATH...
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from Batch import main as batch_main
+        return batch_main(sys.argv[2:])
+
+    # local HTTP recognition service: resistor-recognition serve [--port PORT]
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        from Service import main as serve_main
+        return serve_main(sys.argv[2:])
+
+    # the GUI modules are imported only when the window is wanted
+    import tkinter as tk
+    from FrontEnd import GUI
+
     # main window
     root = tk.Tk()
 
@@ -1,6 +1,6 @@
 """Setup script for Resistor Recognition package."""
 
-from setuptools import setup, find_packages
+from setuptools import setup
 
 with open("README.md", "r", encoding="utf-8") as fh:
     long_description = fh.read()
@@ -14,7 +14,13 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/resistor-recognition",
-    packages=find_packages(),
+    # the application is a set of top-level modules rather than a package; they find the
+    # assets/ directory next to config.py, so install from a checkout with pip install -e .
+    py_modules=[
+        "gui", "FrontEnd", "Artwork", "Preview", "Preprocessing", "Bands", "Analysis", "Decoder",
+        "Pipeline", "Cache", "Buffers", "Worker", "Camera", "Live", "Batch", "Service", "Tracing",
+        "Localisation", "Tracking", "config",
+    ],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Education",